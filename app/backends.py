@@ -0,0 +1,284 @@
+"""Storage backends behind one interface: MySQL, SQLite and DuckDB.
+
+A Backend knows how to open a connection to its engine, the placeholder,
+upsert and date-part syntax of its SQL, the bulk-load methods it supports
+and how its EXPLAIN output names the index a query uses. Migrations, the
+loader, the rollups and the exporter build their SQL through the backend
+selected by db_backend, so each engine runs the same pipeline in its own
+dialect:
+
+- MySQL: multi-row INSERT or LOAD DATA LOCAL INFILE over a server connection.
+- SQLite: one local file in WAL mode with bulk-insert pragmas.
+- DuckDB: one local columnar file; batches are upserted with a single
+  INSERT ... SELECT over a registered DataFrame. Needs the duckdb package.
+"""
+import os
+import sqlite3
+
+import mysql.connector
+
+try:
+    import duckdb
+except ImportError:  # optional: only needed for db_backend = 'duckdb'
+    duckdb = None
+
+# Connection and query errors of every available driver
+DB_ERRORS = (mysql.connector.Error, sqlite3.Error) + ((duckdb.Error,) if duckdb else ())
+
+# Applied to every SQLite connection: WAL lets exports read while a load
+# writes, and the rest trade fsyncs and small page caches for bulk speed
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+)
+
+
+class Backend:
+    """Dialect and connection details of one database engine"""
+    name = None
+    placeholder = '?'
+    load_methods = ('executemany', 'multirow')
+    default_load_method = 'executemany'
+    # False when the engine is meant to answer range queries with full scans
+    uses_indexes = True
+    # False when a failed statement aborts the whole transaction
+    statement_rollback = True
+    # False when an open connection locks the database against other processes
+    pool_connections = True
+
+    def connect(self, config, database=True):
+        """Open a new DB-API connection from config"""
+        raise NotImplementedError
+
+    def location(self, config):
+        """Where the configured database lives, as a string identifying it"""
+        raise NotImplementedError
+
+    def create_database(self, config):
+        """Create the configured database if the engine needs that done up front"""
+
+    def ping(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+
+    def year_expr(self, column='date'):
+        return f"YEAR({column})"
+
+    def month_expr(self, column='date'):
+        return f"MONTH({column})"
+
+    def date_param(self, value):
+        """A date as passed to a query parameter"""
+        return value
+
+    def upsert_clause(self, keys, columns, accumulate=False):
+        """Conflict clause overwriting columns (or adding to them) when keys already exist"""
+        assign = (lambda c: f"{c} = {c} + excluded.{c}") if accumulate else \
+            (lambda c: f"{c} = excluded.{c}")
+        return (f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET "
+                + ", ".join(assign(c) for c in columns))
+
+    def explain(self, cursor, sql, params):
+        """(index name or None, plan lines) for a query"""
+        raise NotImplementedError
+
+
+class MySQLBackend(Backend):
+    name = 'mysql'
+    placeholder = '%s'
+    load_methods = ('executemany', 'multirow', 'load_data')
+
+    def connect(self, config, database=True):
+        params = {
+            'host': config['db_host'],
+            'user': config['db_user'],
+            'password': config['db_password'],
+        }
+        if database:
+            params['database'] = config['db_name']
+        if config.get('load_method') == 'load_data':
+            params['allow_local_infile'] = True
+        return mysql.connector.connect(**params)
+
+    def location(self, config):
+        return f"mysql://{config['db_host']}/{config['db_name']}"
+
+    def create_database(self, config):
+        conn = self.connect(config, database=False)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {config['db_name']}")
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def ping(self, conn):
+        conn.ping(reconnect=True, attempts=1)
+
+    def upsert_clause(self, keys, columns, accumulate=False):
+        assign = (lambda c: f"{c} = {c} + VALUES({c})") if accumulate else \
+            (lambda c: f"{c} = VALUES({c})")
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(assign(c) for c in columns)
+
+    def explain(self, cursor, sql, params):
+        cursor.execute("EXPLAIN " + sql, params)
+        columns = [d[0] for d in cursor.description]
+        plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return next((row['key'] for row in plan if row.get('key')), None), plan
+
+
+class SQLiteBackend(Backend):
+    name = 'sqlite'
+
+    def connect(self, config, database=True):
+        conn = sqlite3.connect(config.get('sqlite_path', 'jewelry_shop.db'),
+                               timeout=30, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def location(self, config):
+        return "sqlite://" + os.path.abspath(config.get('sqlite_path', 'jewelry_shop.db'))
+
+    def year_expr(self, column='date'):
+        return f"CAST(strftime('%Y', {column}) AS INTEGER)"
+
+    def month_expr(self, column='date'):
+        return f"CAST(strftime('%m', {column}) AS INTEGER)"
+
+    def date_param(self, value):
+        return value.isoformat()
+
+    def explain(self, cursor, sql, params):
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        plan = [row[-1] for row in cursor.fetchall()]
+        return next((detail.split(' INDEX ', 1)[1].split()[0]
+                     for detail in plan if ' INDEX ' in detail), None), plan
+
+
+class DuckDBConnection:
+    """DB-API connection over one DuckDB connection.
+
+    DuckDB's own cursor() opens a second connection with its own
+    transaction; here every cursor shares this connection's transaction, so
+    commit() and rollback() cover all of them as with the other drivers.
+    """
+
+    def __init__(self, conn):
+        self.raw = conn
+        self.raw.begin()
+
+    def cursor(self):
+        return DuckDBCursor(self.raw)
+
+    def commit(self):
+        self.raw.commit()
+        self.raw.begin()
+
+    def rollback(self):
+        self.raw.rollback()
+        self.raw.begin()
+
+    def close(self):
+        self.raw.close()
+
+
+class DuckDBCursor:
+    """DB-API cursor on a shared DuckDB connection, with rowcount for DML statements"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+
+    @property
+    def description(self):
+        return self.conn.description
+
+    def execute(self, sql, params=()):
+        self.conn.execute(sql, params)
+        self.rowcount = -1
+        if sql.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.rowcount = self.conn.fetchone()[0]
+        return self
+
+    def executemany(self, sql, params):
+        """Run sql for every parameter row.
+
+        DuckDB executes executemany() one statement per row, so a single-row
+        INSERT ... VALUES is expanded into one multi-row INSERT per 1000 rows
+        instead (the rows must not repeat a conflict key).
+        """
+        params = list(params)
+        head, values, tail = sql.partition(' VALUES ')
+        if not values or not tail.startswith('('):
+            self.conn.executemany(sql, params)
+            self.rowcount = -1
+            return
+        row, rest = tail.split(')', 1)
+        rowcount = 0
+        for start in range(0, len(params), 1000):
+            chunk = params[start:start + 1000]
+            self.execute(head + values + ', '.join([row + ')'] * len(chunk)) + rest,
+                         [value for row_params in chunk for value in row_params])
+            rowcount += self.rowcount
+        self.rowcount = rowcount
+
+    def fetchone(self):
+        return self.conn.fetchone()
+
+    def fetchmany(self, size=1):
+        return self.conn.fetchmany(size)
+
+    def fetchall(self):
+        return self.conn.fetchall()
+
+    def register(self, name, frame):
+        self.conn.register(name, frame)
+
+    def unregister(self, name):
+        self.conn.unregister(name)
+
+    def close(self):
+        pass
+
+
+class DuckDBBackend(Backend):
+    name = 'duckdb'
+    load_methods = ('dataframe', 'executemany')
+    default_load_method = 'dataframe'
+    # Columnar scans with min/max pruning serve the exports; ART indexes would
+    # only add write cost and block upserts of indexed columns
+    uses_indexes = False
+    statement_rollback = False
+    # The database file stays locked while any connection is open, so
+    # connections are closed on release instead of kept idle
+    pool_connections = False
+
+    def connect(self, config, database=True):
+        if duckdb is None:
+            raise ImportError("db_backend 'duckdb' needs the duckdb package (pip install duckdb)")
+        return DuckDBConnection(duckdb.connect(config.get('duckdb_path', 'jewelry_shop.duckdb')))
+
+    def location(self, config):
+        return "duckdb://" + os.path.abspath(config.get('duckdb_path', 'jewelry_shop.duckdb'))
+
+    def explain(self, cursor, sql, params):
+        cursor.execute("EXPLAIN " + sql, params)
+        plan = [line for _, text in cursor.fetchall() for line in text.splitlines()]
+        return ('ART index' if any('INDEX_SCAN' in line for line in plan) else None), plan
+
+
+BACKENDS = {backend.name: backend
+            for backend in (MySQLBackend(), SQLiteBackend(), DuckDBBackend())}
+
+
+def get_backend(name):
+    """The Backend registered under name ('mysql', 'sqlite' or 'duckdb')"""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown database backend: {name}") from None
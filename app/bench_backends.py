@@ -0,0 +1,90 @@
+"""Compare load and export throughput across the storage backends.
+
+Generates one seeded set of workbooks, then for each backend ingests it
+into a fresh database, times the export aggregations run directly against
+billing_records and writes the yearly workbook:
+
+    python app/bench_backends.py --branches 2 --rows 5000
+    python app/bench_backends.py --backends sqlite duckdb mysql --config bench_mysql.json
+
+SQLite and DuckDB use scratch files; MySQL needs --config pointing at a
+scratch database, whose billing tables are used as-is.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import engine
+from backends import BACKENDS, duckdb
+from bench_pipeline import generate
+from db import get_database
+from exporter import YearlyExport
+from instrumentation import Instrumentation
+
+
+def aggregate_seconds(config, year):
+    """Seconds to run the monthly and top-customer aggregations over the raw records"""
+    db = get_database(config)
+    export = YearlyExport(db.dialect, year, use_rollups=False)
+    start = time.perf_counter()
+    db.query(*export.monthly_summary())
+    db.query(*export.top_customers())
+    return time.perf_counter() - start
+
+
+def run(config, folder, work, backend, year):
+    """Ingest, aggregate and export on one backend; returns a dict of figures"""
+    config = dict(config, db_backend=backend,
+                  sqlite_path=os.path.join(work, 'bench.db'),
+                  duckdb_path=os.path.join(work, 'bench.duckdb'),
+                  manifest_path=os.path.join(work, f'{backend}.pkl'),
+                  staging_cache_dir=os.path.join(work, 'staging_cache'),
+                  reject_dir=os.path.join(work, 'rejects'))
+    metrics = Instrumentation()
+    summary = engine.ingest(config, folder, metrics=metrics)
+    stages = metrics.stages
+    load = sum(stages[name].wall_seconds
+               for name in ('diff', 'insert', 'rollups', 'commit') if name in stages)
+    aggregate = aggregate_seconds(config, year)
+    start = time.perf_counter()
+    engine.export_yearly(config, os.path.join(work, f'{backend}.xlsx'), year=year)
+    return {
+        'rows': summary['records_loaded'],
+        'load_rows_per_sec': summary['records_loaded'] / load if load else 0,
+        'aggregate_ms': aggregate * 1000,
+        'export_seconds': time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS))
+    parser.add_argument('--branches', type=int, default=2)
+    parser.add_argument('--years', type=int, nargs='+', default=[2024])
+    parser.add_argument('--rows', type=int, default=5000, help="bills per workbook")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--config', help="config file with the MySQL settings")
+    args = parser.parse_args()
+    backends = args.backends or (['sqlite'] + (['duckdb'] if duckdb else [])
+                                 + (['mysql'] if args.config else []))
+
+    with tempfile.TemporaryDirectory() as work:
+        folder = os.path.join(work, 'workbooks')
+        os.makedirs(folder)
+        rows = generate(folder, args)
+        config = engine.load_config(args.config) if args.config else dict(engine.DEFAULT_CONFIG)
+        config.update({'workers': args.workers, 'pipeline': False, 'report_cache_ttl': 0})
+        print(f"{rows:,} rows in {args.branches * len(args.years) * 12} workbooks\n")
+        print(f"{'backend':<8} {'rows':>10} {'load rows/sec':>14} {'aggregate ms':>13} "
+              f"{'export s':>9}")
+        for backend in backends:
+            os.makedirs(os.path.join(work, backend))
+            result = run(config, folder, os.path.join(work, backend), backend, args.years[0])
+            print(f"{backend:<8} {result['rows']:>10,} {result['load_rows_per_sec']:>14,.0f} "
+                  f"{result['aggregate_ms']:>13.1f} {result['export_seconds']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
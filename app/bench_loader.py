@@ -0,0 +1,94 @@
+"""Benchmark the bulk loader against the legacy per-row iterrows() INSERT loop.
+
+Uses SQLite as a local stand-in for MySQL so it runs without a database server:
+
+    python app/bench_loader.py --rows 100000 --batch-size 1000
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from backends import get_backend
+from bulk_loader import BulkLoader
+from migrations import migrate
+
+
+def build_frame(folder, rows):
+    """Repeat the sample workbooks until the frame holds the requested number of rows"""
+    base = pd.concat([pd.read_excel(f) for f in sorted(glob.glob(os.path.join(folder, "*.xlsx")))],
+                     ignore_index=True).drop_duplicates(subset=['Bill_No'])
+    copies = -(-rows // len(base))
+    df = pd.concat([base] * copies, ignore_index=True).head(rows).copy()
+    df['Bill_No'] = [f"BM{i:09d}" for i in range(len(df))]
+    return df
+
+
+def legacy_load(conn, df):
+    """The original process_data loop, adapted to SQLite placeholders"""
+    cursor = conn.cursor()
+    insert_count = 0
+    for _, row in df.iterrows():
+        try:
+            cursor.execute("""
+                INSERT INTO billing_records
+                (bill_no, date, customer_name, contact_number, item_name,
+                 quantity, weight_grams, rate_per_gram, making_charges,
+                 total_amount, payment_mode)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(bill_no) DO UPDATE SET
+                date = excluded.date,
+                customer_name = excluded.customer_name
+            """, (
+                row['Bill_No'], row['Date'], row['Customer_Name'],
+                row['Contact_Number'], row['Item_Name'], int(row['Quantity']),
+                row['Weight_Grams'], row['Rate_Per_Gram'], row['Making_Charges'],
+                row['Total_Amount'], row['Payment_Mode']
+            ))
+            insert_count += 1
+        except Exception:
+            continue
+    conn.commit()
+    cursor.close()
+    return insert_count
+
+
+def fresh_connection():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn, 'sqlite')
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--folder', default='monthly_billing_data')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    df = build_frame(args.folder, args.rows)
+    print(f"Loading {len(df):,} rows into SQLite (batch size {args.batch_size})\n")
+
+    conn = fresh_connection()
+    start = time.perf_counter()
+    loaded = legacy_load(conn, df)
+    legacy_seconds = time.perf_counter() - start
+    print(f"{'legacy iterrows':<16} {loaded:>10,} rows {legacy_seconds:8.2f}s "
+          f"{loaded / legacy_seconds:12,.0f} rows/sec")
+
+    for method in get_backend('sqlite').load_methods:
+        conn = fresh_connection()
+        start = time.perf_counter()
+        result = BulkLoader(conn, batch_size=args.batch_size, method=method,
+                            dialect='sqlite').load(df)
+        seconds = time.perf_counter() - start
+        print(f"{method:<16} {result.loaded:>10,} rows {seconds:8.2f}s "
+              f"{result.loaded / seconds:12,.0f} rows/sec "
+              f"({legacy_seconds / seconds:.1f}x, {len(result.rejects)} rejects)")
+
+
+if __name__ == '__main__':
+    main()
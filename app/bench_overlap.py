@@ -0,0 +1,98 @@
+"""Benchmark the parse/load pipeline against parsing everything before loading.
+
+Ingests the same seeded workbooks twice into fresh databases, once with
+pipeline off and once with it on, and compares wall time with the sum and
+the maximum of the parse and load stages:
+
+    python app/bench_overlap.py --workbooks 24 --rows 5000 --workers 4
+    python app/bench_overlap.py --backend mysql --config bench_mysql.json
+
+Overlap needs somewhere for the two stages to run at the same time: parser
+processes on spare cores (--workers) and/or a database doing its work on
+the other side of a socket. --latency-ms stands in for the latter on SQLite
+by adding a fixed round trip to every commit.
+"""
+import argparse
+import functools
+import os
+import sqlite3
+import tempfile
+import time
+
+import engine
+from backends import BACKENDS
+from dataset_generator import generate_workbooks, workbook_name
+from instrumentation import Instrumentation
+
+
+def simulate_latency(seconds):
+    """Make every SQLite commit wait like a round trip to a remote server"""
+
+    class RemoteConnection(sqlite3.Connection):
+        def commit(self):
+            time.sleep(seconds)
+            super().commit()
+
+    sqlite3.connect = functools.partial(sqlite3.connect, factory=RemoteConnection)
+
+
+def run(config, folder, work, label, pipeline):
+    """Ingest folder into a fresh database; returns (wall, parse, load) seconds"""
+    config = dict(config, pipeline=pipeline,
+                  sqlite_path=os.path.join(work, f'{label}.db'),
+                  duckdb_path=os.path.join(work, f'{label}.duckdb'),
+                  manifest_path=os.path.join(work, f'{label}.pkl'),
+                  staging_cache_dir=os.path.join(work, f'{label}_cache'))
+    metrics = Instrumentation()
+    start = time.perf_counter()
+    engine.ingest(config, folder, metrics=metrics)
+    wall = time.perf_counter() - start
+    stages = metrics.stages
+    parse = stages['parse'].wall_seconds + (stages['clean'].wall_seconds if 'clean' in stages else 0)
+    load = sum(stages[name].wall_seconds
+               for name in ('diff', 'insert', 'rollups', 'commit') if name in stages)
+    return wall, parse, load
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workbooks', type=int, default=24)
+    parser.add_argument('--rows', type=int, default=5000, help="bills per workbook")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='sqlite')
+    parser.add_argument('--config', help="config file with the MySQL settings")
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help="simulated round trip per SQLite commit")
+    args = parser.parse_args()
+    if args.latency_ms:
+        simulate_latency(args.latency_ms / 1000)
+
+    with tempfile.TemporaryDirectory() as work:
+        folder = os.path.join(work, 'workbooks')
+        os.makedirs(folder)
+        branches = -(-args.workbooks // 12)
+        written = 0
+        for branch, year, month_num, df in generate_workbooks(
+                branches=branches, rows=(args.rows, args.rows), seed=args.seed):
+            if written == args.workbooks:
+                break
+            df.to_excel(os.path.join(folder, workbook_name(branch, year, month_num)), index=False)
+            written += 1
+
+        config = engine.load_config(args.config) if args.config else dict(engine.DEFAULT_CONFIG)
+        config.update({'db_backend': args.backend, 'workers': args.workers,
+                       'batch_size': args.batch_size,
+                       'reject_dir': os.path.join(work, 'rejects')})
+        print(f"{written} workbooks x {args.rows:,} rows, backend {args.backend}"
+              + (f", {args.latency_ms:g} ms per commit" if args.latency_ms else "") + "\n")
+        print(f"{'mode':<12} {'wall':>8} {'parse':>8} {'load':>8} {'sum':>8} {'max':>8}")
+        for label, pipeline in (('sequential', False), ('pipelined', True)):
+            wall, parse, load = run(config, folder, work, label, pipeline)
+            print(f"{label:<12} {wall:8.2f} {parse:8.2f} {load:8.2f} "
+                  f"{parse + load:8.2f} {max(parse, load):8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""End-to-end benchmark of parse, clean, load and export on a synthetic data set.
+
+Generates seeded workbooks with dataset_generator, ingests them into a
+scratch SQLite database (or the MySQL server in --config) and exports them
+again, then compares per-stage throughput with a stored baseline:
+
+    python app/bench_pipeline.py --branches 2 --rows 5000 --seed 1
+    python app/bench_pipeline.py --save-baseline
+    python app/bench_pipeline.py --backend mysql --config bench_mysql.json
+
+A stage more than --tolerance slower than the baseline counts as a
+regression and makes the exit code 1. Point --config at a scratch database:
+its billing tables are used as-is.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import engine
+from backends import BACKENDS
+from dataset_generator import generate_workbooks, workbook_name
+from instrumentation import Instrumentation
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# Reported stage -> instrumentation stages it is made of
+STAGES = {
+    'parse': ('parse',),
+    'clean': ('concat', 'clean'),
+    'load': ('diff', 'insert', 'rollups', 'commit'),
+    'export': ('summary', 'fetch', 'write', 'export'),
+}
+
+
+def generate(folder, args):
+    """Write the benchmark workbooks; returns the number of rows generated"""
+    rows = 0
+    for branch, year, month_num, df in generate_workbooks(
+            args.years, args.branches, (args.rows, args.rows), args.seed,
+            dup_rate=0.01, nan_rate=0.02, bad_total_rate=0.01):
+        df.to_excel(os.path.join(folder, workbook_name(branch, year, month_num)), index=False)
+        rows += len(df)
+    return rows
+
+
+def summarise(metrics):
+    """Per reported stage: seconds, rows handled, rows/sec and peak RSS"""
+    stages = {s['stage']: s for s in metrics.as_dicts()}
+    report = {}
+    for name, parts in STAGES.items():
+        found = [stages[part] for part in parts if part in stages]
+        if not found:
+            continue
+        seconds = sum(s['wall_seconds'] for s in found)
+        rows = max(s['rows_out'] for s in found)
+        report[name] = {
+            'seconds': round(seconds, 3),
+            'rows': rows,
+            'rows_per_sec': round(rows / seconds) if seconds else 0,
+            'peak_rss_mb': max((s['peak_rss_mb'] or 0) for s in found),
+        }
+    return report
+
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline throughput; returns the names of regressed stages"""
+    regressions = []
+    print(f"\n{'stage':<8} {'rows/sec':>12} {'baseline':>12} {'change':>8}")
+    for name, current in results['stages'].items():
+        base = baseline['stages'].get(name)
+        if not base or not base['rows_per_sec']:
+            print(f"{name:<8} {current['rows_per_sec']:>12,} {'-':>12}")
+            continue
+        change = current['rows_per_sec'] / base['rows_per_sec'] - 1
+        flag = '  REGRESSION' if change < -tolerance else ''
+        print(f"{name:<8} {current['rows_per_sec']:>12,} {base['rows_per_sec']:>12,} "
+              f"{change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    if baseline.get('params') != results['params']:
+        print("\nNote: baseline was recorded with different parameters "
+              f"({baseline.get('params')})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--branches', type=int, default=2)
+    parser.add_argument('--years', type=int, nargs='+', default=[2024])
+    parser.add_argument('--rows', type=int, default=5000, help="bills per workbook")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='sqlite')
+    parser.add_argument('--config', help="config file with the MySQL settings")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown before a stage counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        folder = os.path.join(work, 'workbooks')
+        os.makedirs(folder)
+        start = time.perf_counter()
+        rows = generate(folder, args)
+        print(f"Generated {rows:,} rows in {args.branches * len(args.years) * 12} workbooks "
+              f"({time.perf_counter() - start:.1f}s)")
+
+        config = engine.load_config(args.config) if args.config else dict(engine.DEFAULT_CONFIG)
+        config.update({
+            'db_backend': args.backend,
+            'sqlite_path': os.path.join(work, 'bench.db'),
+            'duckdb_path': os.path.join(work, 'bench.duckdb'),
+            'manifest_path': os.path.join(work, 'manifest.pkl'),
+            'staging_cache_dir': os.path.join(work, 'staging_cache'),
+            'reject_dir': os.path.join(work, 'rejects'),
+            'workers': args.workers,
+            # Stages run one after another so each is timed on its own
+            # (bench_overlap.py measures the pipelined mode)
+            'pipeline': False,
+            # Time a real export, not a copy from the report cache
+            'report_cache_ttl': 0,
+        })
+        metrics = Instrumentation()
+        summary = engine.ingest(config, folder, metrics=metrics)
+        engine.export_yearly(config, os.path.join(work, 'export.xlsx'), metrics=metrics)
+
+    results = {
+        'params': {'branches': args.branches, 'years': args.years, 'rows': args.rows,
+                   'seed': args.seed, 'backend': args.backend},
+        'rows_generated': rows,
+        'records_loaded': summary['records_loaded'],
+        'records_rejected': summary['records_rejected'],
+        'stages': summarise(metrics),
+    }
+    print(f"\n{'stage':<8} {'seconds':>9} {'rows':>10} {'rows/sec':>12} {'peak RSS MB':>12}")
+    for name, stage in results['stages'].items():
+        print(f"{name:<8} {stage['seconds']:>9.2f} {stage['rows']:>10,} "
+              f"{stage['rows_per_sec']:>12,} {stage['peak_rss_mb']:>12}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    return 1 if compare(results, baseline, args.tolerance) else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+"""Benchmark parallel workbook parsing from 1 to N worker processes.
+
+Builds a folder of copies of the sample workbooks and times read_workbooks:
+
+    python app/bench_reader.py --files 300 --workers 8
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+from parallel_reader import default_workers, read_workbooks
+
+
+def build_folder(source, target, count):
+    """Fill target with count workbooks copied round-robin from source"""
+    samples = sorted(glob.glob(os.path.join(source, "*.xlsx")))
+    files = []
+    for i in range(count):
+        path = os.path.join(target, f"Workbook_{i:05d}.xlsx")
+        shutil.copyfile(samples[i % len(samples)], path)
+        files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--folder', default='monthly_billing_data')
+    parser.add_argument('--files', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=default_workers())
+    args = parser.parse_args()
+
+    counts = sorted({1, *[2 ** i for i in range(1, args.workers.bit_length())], args.workers})
+    with tempfile.TemporaryDirectory() as target:
+        files = build_folder(args.folder, target, args.files)
+        print(f"Parsing {len(files)} workbooks\n")
+        baseline = None
+        for workers in counts:
+            start = time.perf_counter()
+            frames = read_workbooks(files, workers=workers)
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            rows = sum(len(df) for df in frames)
+            print(f"{workers:>3} workers {seconds:8.2f}s {len(files) / seconds:8.1f} files/sec "
+                  f"{rows / seconds:10,.0f} rows/sec  speed-up {baseline / seconds:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
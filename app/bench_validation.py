@@ -0,0 +1,56 @@
+"""Benchmark the vectorized validation stage on a large synthetic frame.
+
+    python app/bench_validation.py --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from validation import validate
+
+
+def build_frame(rows, seed=0):
+    """Synthetic billing frame with about 1% bad totals and 0.5% unparseable dates"""
+    rng = np.random.default_rng(seed)
+    weight = rng.uniform(2, 100, rows).round(2)
+    rate = rng.uniform(70, 6000, rows).round(2)
+    quantity = rng.integers(1, 4, rows)
+    making = (weight * rng.uniform(50, 2000, rows)).round(2)
+    total = (weight * rate * quantity + making).round(2)
+    total[rng.random(rows) < 0.01] *= 1.5
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 366, rows), unit='D')
+    dates = dates.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    dates[rng.random(rows) < 0.005] = 'not a date'
+    return pd.DataFrame({
+        'Bill_No': np.char.add('JB', np.arange(rows).astype('U10')),
+        'Date': dates,
+        'Customer_Name': rng.choice(['Rajesh Patel', 'Priya Shah', 'Amit Kumar'], rows),
+        'Contact_Number': np.char.add('+91 ', rng.integers(6_000_000_000, 9_999_999_999, rows).astype('U10')),
+        'Item_Name': rng.choice(['Gold Ring', 'Silver Anklet', 'Diamond Pendant'], rows),
+        'Quantity': quantity,
+        'Weight_Grams': weight,
+        'Rate_Per_Gram': rate,
+        'Making_Charges': making,
+        'Total_Amount': total,
+        'Payment_Mode': rng.choice(['Cash', 'Card', 'UPI', 'Bank Transfer'], rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+    start = time.perf_counter()
+    clean, rejects = validate(df)
+    seconds = time.perf_counter() - start
+    print(f"Validated {len(df):,} rows in {seconds:.2f}s ({len(df) / seconds:,.0f} rows/sec)")
+    print(f"  clean: {len(clean):,}  rejected: {len(rejects):,}")
+    print(rejects['Reject_Reason'].value_counts().to_string())
+
+
+if __name__ == '__main__':
+    main()
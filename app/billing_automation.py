@@ -1,11 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
-import mysql.connector
 import pickle
 import os
-import glob
 from datetime import datetime
+import engine
+from backends import BACKENDS
+from job_runner import JobRunner
+from preview import PreviewIndex, PreviewPager
 
 class JewelryBillingAutomation:
     def __init__(self, root):
@@ -15,22 +16,17 @@ class JewelryBillingAutomation:
         self.root.configure(bg='#f0f0f0')
         
         # Configuration storage
-        self.config = {
-            'folder_path': '',
-            'db_host': 'localhost',
-            'db_user': 'root',
-            'db_password': '',
-            'db_name': 'jewelry_shop'
-        }
+        self.config = dict(engine.DEFAULT_CONFIG)
         
         self.load_config()
         self.create_ui()
+        self.jobs = JobRunner(self.root, self.on_job_progress, self.on_job_finished)
         
     def load_config(self):
         """Load saved configuration from pickle file"""
         if os.path.exists('config.pkl'):
             with open('config.pkl', 'rb') as f:
-                self.config = pickle.load(f)
+                self.config.update(pickle.load(f))
                 
     def save_config(self):
         """Save configuration to pickle file"""
@@ -71,7 +67,7 @@ class JewelryBillingAutomation:
         browse_btn.pack(side='left')
         
         # Step 2: Database Configuration
-        step2_frame = tk.LabelFrame(main_frame, text="Step 2: MySQL Database Configuration",
+        step2_frame = tk.LabelFrame(main_frame, text="Step 2: Database Configuration",
                                    font=('Arial', 12, 'bold'), bg='white', fg='#2c3e50',
                                    padx=15, pady=15)
         step2_frame.pack(fill='x', pady=(0, 15))
@@ -79,6 +75,18 @@ class JewelryBillingAutomation:
         db_grid = tk.Frame(step2_frame, bg='white')
         db_grid.pack(fill='x')
         
+        # Backend selection; SQLite and DuckDB only need a file path
+        tk.Label(db_grid, text="Backend:", bg='white', font=('Arial', 10)).grid(row=2, column=0, sticky='w', pady=5)
+        self.backend_var = tk.StringVar(value=self.config.get('db_backend', 'mysql'))
+        self.backend_combo = ttk.Combobox(db_grid, textvariable=self.backend_var, values=sorted(BACKENDS),
+                                          state='readonly', width=17)
+        self.backend_combo.grid(row=2, column=1, padx=10, pady=5, sticky='w')
+        self.backend_combo.bind('<<ComboboxSelected>>', lambda event: self.on_backend_changed())
+        
+        tk.Label(db_grid, text="File:", bg='white', font=('Arial', 10)).grid(row=2, column=2, sticky='w', pady=5)
+        self.path_entry = tk.Entry(db_grid, font=('Arial', 10), width=20)
+        self.path_entry.grid(row=2, column=3, padx=10, pady=5, sticky='w')
+        
         # Database fields
         tk.Label(db_grid, text="Host:", bg='white', font=('Arial', 10)).grid(row=0, column=0, sticky='w', pady=5)
         self.host_entry = tk.Entry(db_grid, font=('Arial', 10), width=20)
@@ -99,6 +107,7 @@ class JewelryBillingAutomation:
         self.db_entry = tk.Entry(db_grid, font=('Arial', 10), width=20)
         self.db_entry.grid(row=1, column=3, padx=10, pady=5, sticky='w')
         self.db_entry.insert(0, self.config.get('db_name', 'jewelry_shop'))
+        self.on_backend_changed()
         
         test_btn = tk.Button(step2_frame, text="🔌 Test Connection", command=self.test_connection,
                            bg='#9b59b6', fg='white', font=('Arial', 10, 'bold'),
@@ -120,12 +129,21 @@ class JewelryBillingAutomation:
         tree_frame = tk.Frame(step3_frame, bg='white')
         tree_frame.pack(fill='both', expand=True)
         
-        tree_scroll = tk.Scrollbar(tree_frame)
-        tree_scroll.pack(side='right', fill='y')
+        self.tree_scroll = tk.Scrollbar(tree_frame, command=self.scroll_preview)
+        self.tree_scroll.pack(side='right', fill='y')
         
-        self.tree = ttk.Treeview(tree_frame, yscrollcommand=tree_scroll.set, height=8)
+        # The tree only holds the rows that fit on screen; scrolling swaps
+        # their values from preview_rows, which grows a page at a time as
+        # the window nears the end
+        self.tree = ttk.Treeview(tree_frame, height=8)
         self.tree.pack(fill='both', expand=True)
-        tree_scroll.config(command=self.tree.yview)
+        self.tree.bind('<Configure>', self.on_tree_resize)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_tree_wheel)
+        self.preview_pager = None
+        self.preview_rows = []
+        self.preview_offset = 0
+        self.preview_window = 8
         
         # Info label
         self.info_label = tk.Label(step3_frame, text="", bg='white', 
@@ -136,20 +154,79 @@ class JewelryBillingAutomation:
         step4_frame = tk.Frame(main_frame, bg='#f0f0f0')
         step4_frame.pack(fill='x')
         
-        process_btn = tk.Button(step4_frame, text="⚙️ Process & Save to Database",
-                               command=self.process_data, bg='#27ae60', fg='white',
-                               font=('Arial', 12, 'bold'), padx=30, pady=10, cursor='hand2')
-        process_btn.pack(side='left', padx=(0, 10))
+        self.process_btn = tk.Button(step4_frame, text="⚙️ Process & Save to Database",
+                                     command=self.process_data, bg='#27ae60', fg='white',
+                                     font=('Arial', 12, 'bold'), padx=30, pady=10, cursor='hand2')
+        self.process_btn.pack(side='left', padx=(0, 10))
+        
+        self.export_btn = tk.Button(step4_frame, text="📊 Export Yearly Excel",
+                                    command=self.export_yearly_excel, bg='#16a085', fg='white',
+                                    font=('Arial', 12, 'bold'), padx=30, pady=10, cursor='hand2')
+        self.export_btn.pack(side='left')
+        
+        tk.Label(step4_frame, text="Year (blank = all):", bg='#f0f0f0',
+                 font=('Arial', 10)).pack(side='left', padx=(15, 5))
+        self.year_entry = tk.Entry(step4_frame, font=('Arial', 10), width=6)
+        self.year_entry.pack(side='left')
         
-        export_btn = tk.Button(step4_frame, text="📊 Export Yearly Excel",
-                              command=self.export_yearly_excel, bg='#16a085', fg='white',
-                              font=('Arial', 12, 'bold'), padx=30, pady=10, cursor='hand2')
-        export_btn.pack(side='left')
+        # Status bar with progress for background jobs
+        status_frame = tk.Frame(self.root, bg='#34495e')
+        status_frame.pack(side='bottom', fill='x')
         
-        # Status bar
-        self.status_label = tk.Label(self.root, text="Ready", bg='#34495e', fg='white',
+        self.status_label = tk.Label(status_frame, text="Ready", bg='#34495e', fg='white',
                                      font=('Arial', 9), anchor='w', padx=10)
-        self.status_label.pack(side='bottom', fill='x')
+        self.status_label.pack(side='left', fill='x', expand=True)
+        
+        self.cancel_btn = tk.Button(status_frame, text="✖ Cancel", command=self.cancel_job,
+                                    bg='#c0392b', fg='white', font=('Arial', 8, 'bold'),
+                                    padx=8, cursor='hand2')
+        self.progress_bar = ttk.Progressbar(status_frame, length=200, mode='determinate',
+                                            maximum=100)
+    
+    def start_job(self, job, args, on_done, failure_title):
+        """Run a long job on a worker thread with the progress bar shown"""
+        if self.jobs.running:
+            messagebox.showwarning("Warning", "Another task is still running!")
+            return
+        
+        def on_error(error):
+            messagebox.showerror("Error", f"{failure_title} failed:\n{str(error)}")
+            self.status_label.config(text=f"{failure_title} failed")
+        
+        def on_cancelled():
+            self.status_label.config(text=f"{failure_title} cancelled")
+        
+        self.process_btn.config(state='disabled')
+        self.export_btn.config(state='disabled')
+        self.progress_bar['value'] = 0
+        self.cancel_btn.pack(side='right', padx=5, pady=2)
+        self.progress_bar.pack(side='right', padx=5, pady=2)
+        self.jobs.start(job, args, on_done=on_done, on_error=on_error, on_cancelled=on_cancelled)
+    
+    def cancel_job(self):
+        """Cancel the running background job"""
+        self.jobs.cancel()
+        self.status_label.config(text="Cancelling...")
+    
+    def on_job_progress(self, event):
+        """Show a progress event in the status bar"""
+        parts = [event.message]
+        if event.files_total:
+            parts.append(f"Files {event.files_done}/{event.files_total}")
+        if event.rows_loaded:
+            parts.append(f"{event.rows_loaded:,} rows")
+            parts.append(f"{event.rows_per_sec:,.0f} rows/sec")
+        if event.eta_seconds is not None:
+            parts.append(f"ETA {int(event.eta_seconds) // 60}:{int(event.eta_seconds) % 60:02d}")
+        self.status_label.config(text=" | ".join(p for p in parts if p))
+        self.progress_bar['value'] = event.fraction * 100
+    
+    def on_job_finished(self):
+        """Hide the progress bar once a job ends"""
+        self.progress_bar.pack_forget()
+        self.cancel_btn.pack_forget()
+        self.process_btn.config(state='normal')
+        self.export_btn.config(state='normal')
     
     def browse_folder(self):
         """Browse for folder containing Excel files"""
@@ -161,72 +238,150 @@ class JewelryBillingAutomation:
             self.save_config()
             self.status_label.config(text=f"Folder selected: {folder}")
     
+    def on_backend_changed(self):
+        """Enable the server fields for MySQL and the file field for SQLite/DuckDB"""
+        backend = self.backend_var.get()
+        server = backend == 'mysql'
+        for entry in (self.host_entry, self.user_entry, self.pass_entry, self.db_entry):
+            entry.config(state='normal' if server else 'disabled')
+        self.path_entry.config(state='normal')
+        self.path_entry.delete(0, tk.END)
+        if not server:
+            self.path_entry.insert(0, self.config.get(f'{backend}_path', ''))
+        self.path_entry.config(state='disabled' if server else 'normal')
+    
     def test_connection(self):
-        """Test MySQL database connection"""
+        """Test the selected database backend, creating the database and tables if needed"""
         try:
-            conn = mysql.connector.connect(
-                host=self.host_entry.get(),
-                user=self.user_entry.get(),
-                password=self.pass_entry.get()
-            )
+            # Test the entered settings on a copy; keep them only if they work
+            backend = self.backend_var.get()
+            config = dict(self.config, db_backend=backend)
+            if backend == 'mysql':
+                config['db_host'] = self.host_entry.get()
+                config['db_user'] = self.user_entry.get()
+                config['db_password'] = self.pass_entry.get()
+                config['db_name'] = self.db_entry.get()
+            else:
+                config[f'{backend}_path'] = self.path_entry.get()
             
-            # Create database if not exists
-            cursor = conn.cursor()
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_entry.get()}")
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            # Update config
-            self.config['db_host'] = self.host_entry.get()
-            self.config['db_user'] = self.user_entry.get()
-            self.config['db_password'] = self.pass_entry.get()
-            self.config['db_name'] = self.db_entry.get()
+            engine.test_connection(config)
+            self.config = config
             self.save_config()
             
-            messagebox.showinfo("Success", "Database connection successful!\nDatabase created if not existed.")
+            messagebox.showinfo("Success", f"Database connection successful ({backend})!\nDatabase created if not existed.")
             self.status_label.config(text="Database connection successful")
         except Exception as e:
             messagebox.showerror("Error", f"Connection failed:\n{str(e)}")
             self.status_label.config(text="Database connection failed")
     
     def preview_data(self):
-        """Preview data from Excel files"""
+        """Preview the leading rows of every Excel file from the cached sample index"""
         folder = self.folder_entry.get()
         if not folder or not os.path.exists(folder):
             messagebox.showwarning("Warning", "Please select a valid folder first!")
             return
         
         try:
-            # Get all Excel files
-            excel_files = glob.glob(os.path.join(folder, "*.xlsx"))
+            excel_files = [source.path for source in engine.discover_sources(self.config, folder)]
             if not excel_files:
                 messagebox.showwarning("Warning", "No Excel files found in selected folder!")
                 return
             
-            # Read first file for preview
-            df = pd.read_excel(excel_files[0])
+            index = PreviewIndex.load(self.config['preview_index_path'],
+                                      self.config['preview_rows'],
+                                      staging=engine.staging_cache(self.config))
+            index.prune(excel_files)
+            self.preview_pager = PreviewPager(excel_files, index, root=folder)
+            page = self.preview_pager.next_page()
             
-            # Clear existing tree
+            # Clear existing rows
             self.tree.delete(*self.tree.get_children())
+            self.preview_rows = []
+            self.preview_offset = 0
             
             # Configure columns
-            self.tree['columns'] = list(df.columns)
+            columns = ['File'] + self.preview_pager.columns
+            self.tree['columns'] = columns
             self.tree['show'] = 'headings'
             
-            for col in df.columns:
+            for col in columns:
                 self.tree.heading(col, text=col)
                 self.tree.column(col, width=100)
             
-            # Add data (first 10 rows)
-            for idx, row in df.head(10).iterrows():
-                self.tree.insert('', 'end', values=list(row))
-            
-            self.info_label.config(text=f"Found {len(excel_files)} Excel files | Showing first 10 rows from {os.path.basename(excel_files[0])}")
+            self.add_preview_rows(page)
             self.status_label.config(text=f"Preview loaded: {len(excel_files)} files found")
         except Exception as e:
             messagebox.showerror("Error", f"Preview failed:\n{str(e)}")
     
+    def add_preview_rows(self, page):
+        """Append one page of preview rows and update the summary line"""
+        columns = self.tree['columns'][1:]
+        self.preview_rows.extend([name] + ['' if row.get(col) is None else row[col]
+                                           for col in columns]
+                                 for name, row in page)
+        pager = self.preview_pager
+        self.info_label.config(
+            text=f"Found {len(pager.files)} Excel files | Previewed {pager.position} "
+                 f"({pager.rows_seen:,} rows) | Showing first {pager.index.nrows} rows of each"
+                 + ("" if pager.exhausted else " | Scroll for more"))
+        self.show_preview_window()
+    
+    def show_preview_window(self):
+        """Fill the tree's fixed set of rows from preview_rows at the current offset"""
+        items = self.tree.get_children()
+        if len(items) > self.preview_window:
+            self.tree.delete(*items[self.preview_window:])
+        for _ in range(len(items), self.preview_window):
+            self.tree.insert('', 'end')
+        total = len(self.preview_rows)
+        blank = [''] * len(self.tree['columns'])
+        for position, item in enumerate(self.tree.get_children(), start=self.preview_offset):
+            self.tree.item(item, values=self.preview_rows[position] if position < total else blank)
+        if total:
+            self.tree_scroll.set(self.preview_offset / total,
+                                 min(1.0, (self.preview_offset + self.preview_window) / total))
+        else:
+            self.tree_scroll.set(0.0, 1.0)
+        
+        # Load the next page once the window nears the end of the loaded rows
+        pager = self.preview_pager
+        if pager and not pager.exhausted and \
+                self.preview_offset + 2 * self.preview_window >= total:
+            try:
+                self.add_preview_rows(pager.next_page())
+            except Exception as e:
+                self.preview_pager = None
+                messagebox.showerror("Error", f"Preview failed:\n{str(e)}")
+    
+    def scroll_preview(self, action, amount, unit=None):
+        """Scrollbar command: move the preview window ('moveto' fraction or 'scroll' steps)"""
+        total = len(self.preview_rows)
+        if action == 'moveto':
+            offset = int(float(amount) * total)
+        else:
+            offset = self.preview_offset + int(amount) * (
+                self.preview_window if unit == 'pages' else 1)
+        self.preview_offset = max(0, min(offset, total - self.preview_window))
+        self.show_preview_window()
+    
+    def on_tree_wheel(self, event):
+        """Scroll the preview window with the mouse wheel instead of the tree itself"""
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.scroll_preview('scroll', -3 if up else 3, 'units')
+        return 'break'
+    
+    def on_tree_resize(self, event):
+        """Size the row window to the rows that fit in the tree's new height"""
+        items = self.tree.get_children()
+        box = self.tree.bbox(items[0]) if items else None
+        top, row_height = (box[1], box[3]) if box else (25, 20)
+        window = max(1, (event.height - top) // row_height)
+        if window != self.preview_window:
+            self.preview_window = window
+            self.preview_offset = max(0, min(self.preview_offset,
+                                             len(self.preview_rows) - window))
+            self.show_preview_window()
+    
     def process_data(self):
         """Process all Excel files and save to database"""
         folder = self.folder_entry.get()
@@ -234,144 +389,76 @@ class JewelryBillingAutomation:
             messagebox.showwarning("Warning", "Please select a valid folder first!")
             return
         
-        try:
-            self.status_label.config(text="Processing data...")
-            self.root.update()
-            
-            # Get all Excel files
-            excel_files = glob.glob(os.path.join(folder, "*.xlsx"))
-            
-            # Read and combine all files
-            all_data = []
-            for file in excel_files:
-                df = pd.read_excel(file)
-                all_data.append(df)
-            
-            combined_df = pd.concat(all_data, ignore_index=True)
-            
-            # Data cleaning
-            combined_df = combined_df.drop_duplicates()
-            combined_df = combined_df.dropna(subset=['Bill_No'])
-            
-            # Connect to database
-            conn = mysql.connector.connect(
-                host=self.config['db_host'],
-                user=self.config['db_user'],
-                password=self.config['db_password'],
-                database=self.config['db_name']
-            )
-            cursor = conn.cursor()
-            
-            # Create table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS billing_records (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    bill_no VARCHAR(50) UNIQUE,
-                    date DATE,
-                    customer_name VARCHAR(100),
-                    contact_number VARCHAR(20),
-                    item_name VARCHAR(100),
-                    quantity INT,
-                    weight_grams DECIMAL(10, 2),
-                    rate_per_gram DECIMAL(10, 2),
-                    making_charges DECIMAL(10, 2),
-                    total_amount DECIMAL(12, 2),
-                    payment_mode VARCHAR(50),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Insert data
-            insert_count = 0
-            for _, row in combined_df.iterrows():
-                try:
-                    cursor.execute("""
-                        INSERT INTO billing_records 
-                        (bill_no, date, customer_name, contact_number, item_name, 
-                         quantity, weight_grams, rate_per_gram, making_charges, 
-                         total_amount, payment_mode)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON DUPLICATE KEY UPDATE
-                        date = VALUES(date),
-                        customer_name = VALUES(customer_name)
-                    """, (
-                        row['Bill_No'], row['Date'], row['Customer_Name'],
-                        row['Contact_Number'], row['Item_Name'], row['Quantity'],
-                        row['Weight_Grams'], row['Rate_Per_Gram'], row['Making_Charges'],
-                        row['Total_Amount'], row['Payment_Mode']
-                    ))
-                    insert_count += 1
-                except:
-                    continue
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            messagebox.showinfo("Success", 
-                f"Data processed successfully!\n\n"
-                f"Files processed: {len(excel_files)}\n"
-                f"Records inserted/updated: {insert_count}\n"
-                f"Duplicates removed: {len(combined_df) - insert_count}")
-            self.status_label.config(text=f"Processing complete: {insert_count} records saved")
-        except Exception as e:
-            messagebox.showerror("Error", f"Processing failed:\n{str(e)}")
-            self.status_label.config(text="Processing failed")
+        self.status_label.config(text="Processing data...")
+        self.start_job(self.ingest_job, (folder,), self.on_ingest_done, "Processing")
+    
+    def ingest_job(self, progress, folder):
+        """Read, clean and load changed workbooks (runs on the worker thread)"""
+        return engine.ingest(self.config, folder, progress)
+    
+    def on_ingest_done(self, summary):
+        """Report the outcome of ingest_job"""
+        if not summary['files_processed']:
+            messagebox.showinfo("Up to date",
+                f"No new or modified Excel files.\n\n"
+                f"Files unchanged: {summary['files_unchanged']}")
+            self.status_label.config(text="Processing complete: all files up to date")
+            return
+        
+        slowest = max(summary['stages'], key=lambda stage: stage['wall_seconds'])
+        messagebox.showinfo("Success", 
+            f"Data processed successfully!\n\n"
+            f"Files processed: {summary['files_processed']}\n"
+            f"Files unchanged (skipped): {summary['files_unchanged']}\n"
+            f"Records inserted: {summary['records_inserted']}\n"
+            f"Records updated: {summary['records_updated']}\n"
+            f"Records unchanged: {summary['records_unchanged']}\n"
+            f"Records deleted: {summary['records_deleted']}\n"
+            f"Records rejected: {summary['records_rejected']}"
+            f" ({summary['records_duplicate']} duplicate bill numbers)\n"
+            f"Load speed: {summary['rows_per_sec']:,.0f} rows/sec\n"
+            f"Slowest stage: {slowest['stage']} ({slowest['wall_seconds']:.2f}s)"
+            + (f"\n\nRejected rows saved to:\n{summary['reject_file']}"
+               if summary['reject_file'] else ""))
+        self.status_label.config(text=f"Processing complete: {summary['records_loaded']} records saved")
     
     def export_yearly_excel(self):
         """Export consolidated yearly Excel file"""
-        try:
-            self.status_label.config(text="Exporting yearly Excel...")
-            self.root.update()
-            
-            # Connect to database
-            conn = mysql.connector.connect(
-                host=self.config['db_host'],
-                user=self.config['db_user'],
-                password=self.config['db_password'],
-                database=self.config['db_name']
-            )
-            
-            # Read all data
-            query = "SELECT * FROM billing_records ORDER BY date"
-            df = pd.read_sql(query, conn)
-            conn.close()
-            
-            if df.empty:
-                messagebox.showwarning("Warning", "No data found in database!")
-                return
-            
-            # Save file
-            year = datetime.now().year
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                initialfile=f"Jewelry_Billing_Yearly_{year}.xlsx",
-                filetypes=[("Excel files", "*.xlsx")]
-            )
-            
-            if filename:
-                # Create Excel writer with multiple sheets
-                with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                    # All data
-                    df.to_excel(writer, sheet_name='All Records', index=False)
-                    
-                    # Summary by month
-                    df['date'] = pd.to_datetime(df['date'])
-                    monthly_summary = df.groupby(df['date'].dt.month).agg({
-                        'total_amount': 'sum',
-                        'bill_no': 'count'
-                    }).rename(columns={'bill_no': 'total_transactions'})
-                    monthly_summary.to_excel(writer, sheet_name='Monthly Summary')
-                    
-                    # Top customers
-                    top_customers = df.groupby('customer_name')['total_amount'].sum().sort_values(ascending=False).head(10)
-                    top_customers.to_excel(writer, sheet_name='Top Customers')
-                
-                messagebox.showinfo("Success", f"Yearly Excel file exported successfully!\n\nLocation: {filename}")
-                self.status_label.config(text=f"Export complete: {filename}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Export failed:\n{str(e)}")
-            self.status_label.config(text="Export failed")
+        year_text = self.year_entry.get().strip()
+        if year_text and not year_text.isdigit():
+            messagebox.showwarning("Warning", "Please enter a valid year, or leave it blank!")
+            return
+        year = int(year_text) if year_text else None
+        
+        # Save file
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            initialfile=f"Jewelry_Billing_Yearly_{year or datetime.now().year}.xlsx",
+            filetypes=[("Excel files", "*.xlsx")]
+        )
+        if not filename:
+            return
+        
+        self.status_label.config(text="Exporting yearly Excel...")
+        self.start_job(self.export_job, (filename, year), self.on_export_done, "Export")
+    
+    def export_job(self, progress, filename, year):
+        """Write the yearly workbook (runs on the worker thread)"""
+        records = engine.export_yearly(self.config, filename, year=year, progress=progress)
+        return (filename if records else None), engine.report_cache_stats(self.config)
+    
+    def on_export_done(self, result):
+        """Report the outcome of export_job"""
+        filename, cache_stats = result
+        cache_text = (f" | Report cache: {cache_stats['hits'] + cache_stats['summary_hits']} hits, "
+                      f"{cache_stats['misses']} misses" if cache_stats else "")
+        if filename is None:
+            messagebox.showwarning("Warning", "No data found in database!")
+            self.status_label.config(text="Export skipped: no data" + cache_text)
+            return
+        
+        messagebox.showinfo("Success", f"Yearly Excel file exported successfully!\n\nLocation: {filename}")
+        self.status_label.config(text=f"Export complete: {filename}" + cache_text)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,185 @@
+"""Headless entry point for scheduled ingestion and exports.
+
+    python app/billing_cli.py ingest --folder monthly_billing_data
+    python app/billing_cli.py export --year 2024 --output Jewelry_Billing_Yearly_2024.xlsx
+    python app/billing_cli.py stats
+    python app/billing_cli.py cache --clear
+
+Configuration comes from --config (a config.pkl or .json file), then
+BILLING_* environment variables (BILLING_DB_HOST, BILLING_DB_PASSWORD, ...),
+then command-line flags. Each run prints a JSON summary on stdout.
+
+--log-metrics writes one JSON line per pipeline stage (wall/CPU time, rows
+in/out, peak RSS) to stderr, --prometheus FILE writes the same figures in the
+Prometheus text format (for node_exporter's textfile collector), and
+--profile FILE keeps a cProfile dump of the slowest run seen so far.
+
+Exit codes: 0 success, 1 failure, 2 usage error, 3 rows were rejected,
+4 check-indexes found a query without an index, 5 check-rollups found
+rollups that differ from the raw records.
+"""
+import argparse
+import cProfile
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date
+
+import engine
+from backends import BACKENDS
+from instrumentation import Instrumentation
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_REJECTS = 3
+EXIT_UNINDEXED = 4
+EXIT_INCONSISTENT = 5
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='billing-automation',
+        description="Load monthly billing workbooks into a database and export yearly reports.")
+    parser.add_argument('--config', help="config file (.pkl or .json); defaults to $BILLING_CONFIG")
+    parser.add_argument('--backend', dest='db_backend', choices=sorted(BACKENDS),
+                        help="storage backend (overrides db_backend)")
+    parser.add_argument('--log-metrics', action='store_true',
+                        help="log per-stage metrics as JSON lines on stderr")
+    parser.add_argument('--prometheus', metavar='FILE',
+                        help="write per-stage metrics in Prometheus text format")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="write a cProfile dump here if this is the slowest run so far")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="load new or changed workbooks")
+    ingest.add_argument('--folder', help="folder of monthly .xlsx files")
+    ingest.add_argument('--workers', type=int, help="parser processes")
+    ingest.add_argument('--batch-size', type=int, help="rows per database batch")
+    ingest.add_argument('--load-method',
+                        choices=('executemany', 'multirow', 'load_data', 'dataframe'),
+                        help="bulk-load method (default: the backend's own)")
+    ingest.add_argument('--upsert-mode', choices=('diff', 'always'),
+                        help="write only new or changed bills (diff) or every bill (always)")
+    ingest.add_argument('--streaming', action='store_true', default=None,
+                        help="stream rows with bounded memory")
+    ingest.add_argument('--pipeline', action=argparse.BooleanOptionalAction, default=None,
+                        help="overlap parsing with database writes (default: on)")
+
+    export = commands.add_parser('export', help="write the yearly Excel report")
+    export.add_argument('--output', required=True, help="target .xlsx file")
+    export.add_argument('--year', type=int, help="only bills dated in this year")
+    export.add_argument('--from', dest='start_date', type=date.fromisoformat,
+                        help="only bills on or after this date (YYYY-MM-DD)")
+    export.add_argument('--to', dest='end_date', type=date.fromisoformat,
+                        help="only bills before this date (YYYY-MM-DD)")
+
+    commands.add_parser('stats', help="show database and manifest statistics")
+
+    migrate = commands.add_parser('migrate', help="apply pending schema migrations")
+    migrate.add_argument('--partition', nargs=2, type=int, metavar=('FIRST_YEAR', 'LAST_YEAR'),
+                         help="also partition billing_records by year (MySQL only)")
+
+    check = commands.add_parser('check-indexes',
+                                help="EXPLAIN the ranged export queries and report index use")
+    check.add_argument('--year', type=int, help="year to check (default: this year)")
+
+    rollups = commands.add_parser('check-rollups',
+                                  help="verify the rollup tables against a full recompute")
+    rollups.add_argument('--repair', action='store_true', help="rebuild them if they differ")
+
+    cache = commands.add_parser('cache', help="show or invalidate the workbook and report caches")
+    cache.add_argument('--invalidate', nargs='+', metavar='FILE',
+                       help="drop the cached frames of these workbooks")
+    cache.add_argument('--clear', action='store_true', help="drop every cached frame")
+    cache.add_argument('--clear-reports', action='store_true',
+                       help="drop every cached yearly report")
+    return parser
+
+
+def run(args, metrics=None):
+    """Execute a parsed command, returning (exit code, summary dict)"""
+    metrics = metrics or Instrumentation()
+    config = engine.load_config(args.config)
+    for key in ('db_backend', 'folder', 'workers', 'batch_size', 'load_method', 'upsert_mode',
+                'streaming', 'pipeline'):
+        value = getattr(args, key, None)
+        if value is not None:
+            config['folder_path' if key == 'folder' else key] = value
+
+    if args.command == 'ingest':
+        summary = engine.ingest(config, metrics=metrics)
+        return (EXIT_REJECTS if summary['records_rejected'] else EXIT_OK), summary
+    if args.command == 'export':
+        records = engine.export_yearly(config, args.output, year=args.year,
+                                       start_date=args.start_date, end_date=args.end_date,
+                                       metrics=metrics)
+        return EXIT_OK, {'output': args.output if records else None, 'records': records,
+                         'report_cache': engine.report_cache_stats(config),
+                         'stages': metrics.as_dicts()}
+    if args.command == 'migrate':
+        return EXIT_OK, engine.migrate(config, args.partition)
+    if args.command == 'check-indexes':
+        report = engine.check_indexes(config, args.year)
+        return (EXIT_OK if report['all_indexed'] else EXIT_UNINDEXED), report
+    if args.command == 'check-rollups':
+        report = engine.rollup_check(config, repair=args.repair)
+        consistent = report['consistent'] or report['repaired']
+        return (EXIT_OK if consistent else EXIT_INCONSISTENT), report
+    if args.command == 'cache':
+        return EXIT_OK, engine.cache(config, invalidate=args.invalidate, clear=args.clear,
+                                     clear_reports=args.clear_reports)
+    return EXIT_OK, engine.stats(config)
+
+
+def save_profile(profiler, path, command, elapsed):
+    """Dump profiler stats to path unless it already holds a slower run; returns True if written"""
+    meta_path = path + '.json'
+    if os.path.exists(meta_path) and os.path.exists(path):
+        with open(meta_path, encoding='utf-8') as f:
+            if json.load(f).get('elapsed_seconds', 0) >= elapsed:
+                return False
+    profiler.dump_stats(path)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'command': command, 'elapsed_seconds': elapsed}, f)
+    return True
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics = Instrumentation()
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    try:
+        if profiler:
+            profiler.enable()
+        try:
+            code, summary = run(args, metrics)
+        finally:
+            if profiler:
+                profiler.disable()
+        status = {EXIT_OK: 'ok', EXIT_REJECTS: 'rejects', EXIT_UNINDEXED: 'unindexed',
+                  EXIT_INCONSISTENT: 'inconsistent'}[code]
+        summary = {'command': args.command, 'status': status,
+                   **summary}
+    except Exception as e:
+        code, summary = EXIT_FAILED, {'command': args.command, 'status': 'error', 'error': str(e)}
+    summary['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+
+    if args.log_metrics:
+        logging.basicConfig(stream=sys.stderr, level=logging.INFO, format='%(message)s')
+        metrics.log(run=args.command)
+    if args.prometheus:
+        with open(args.prometheus, 'w', encoding='utf-8') as f:
+            f.write(metrics.prometheus(labels={'command': args.command}))
+    if profiler:
+        summary['profile_saved'] = save_profile(profiler, args.profile, args.command,
+                                                summary['elapsed_seconds'])
+    json.dump(summary, sys.stdout, indent=2, default=str)
+    sys.stdout.write('\n')
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
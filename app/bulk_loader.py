@@ -0,0 +1,346 @@
+import csv
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from backends import get_backend
+from instrumentation import Instrumentation
+
+logger = logging.getLogger('billing.loader')
+
+# Excel column -> (database column, type)
+COLUMNS = [
+    ('Bill_No', 'bill_no', 'text'),
+    ('Date', 'date', 'date'),
+    ('Customer_Name', 'customer_name', 'text'),
+    ('Contact_Number', 'contact_number', 'text'),
+    ('Item_Name', 'item_name', 'text'),
+    ('Quantity', 'quantity', 'int'),
+    ('Weight_Grams', 'weight_grams', 'decimal'),
+    ('Rate_Per_Gram', 'rate_per_gram', 'decimal'),
+    ('Making_Charges', 'making_charges', 'decimal'),
+    ('Total_Amount', 'total_amount', 'decimal'),
+    ('Payment_Mode', 'payment_mode', 'text'),
+    ('Branch', 'branch', 'text'),
+    ('Source_File', 'source_file', 'text'),
+    ('Source_Sheet', 'source_sheet', 'text'),
+]
+
+DB_COLUMNS = [db_col for _, db_col, _ in COLUMNS]
+
+# Columns written per row: the data columns plus the content hash of their values
+WRITE_COLUMNS = DB_COLUMNS + ['row_hash']
+BRANCH_INDEX = DB_COLUMNS.index('branch')
+
+LOAD_METHODS = ('executemany', 'multirow', 'load_data', 'dataframe')
+
+
+@dataclass
+class BatchResult:
+    """Outcome of loading a single batch"""
+    batch_no: int
+    rows: int
+    loaded: int
+    seconds: float
+    rejects: list = field(default_factory=list)
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class LoadResult:
+    """Outcome of a full bulk load"""
+    batches: list = field(default_factory=list)
+
+    @property
+    def loaded(self):
+        return sum(b.loaded for b in self.batches)
+
+    @property
+    def rejects(self):
+        return [r for b in self.batches for r in b.rejects]
+
+    @property
+    def inserted(self):
+        return sum(b.inserted for b in self.batches)
+
+    @property
+    def updated(self):
+        return sum(b.updated for b in self.batches)
+
+    @property
+    def unchanged(self):
+        return sum(b.unchanged for b in self.batches)
+
+    @property
+    def seconds(self):
+        return sum(b.seconds for b in self.batches)
+
+    @property
+    def rows_per_sec(self):
+        """Rows processed (written or found unchanged) per second"""
+        rows = sum(b.rows for b in self.batches)
+        return rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _typed_column(series, kind):
+    """Convert a DataFrame column to a list of database-ready Python values"""
+    if kind == 'date':
+        values = pd.to_datetime(series, errors='coerce')
+        return [v.date() if not pd.isna(v) else None for v in values]
+    if kind in ('int', 'decimal'):
+        values = pd.to_numeric(series, errors='coerce')
+        if kind == 'decimal':
+            values = values.round(2)
+        out = values.astype(object).where(values.notna(), None).tolist()
+        if kind == 'int':
+            return [int(v) if v is not None else None for v in out]
+        return [float(v) if v is not None else None for v in out]
+    values = series.astype(object).where(series.notna(), None).tolist()
+    return [str(v).strip() if v is not None else None for v in values]
+
+
+def row_hash(row):
+    """Content hash of a typed row tuple, identical across runs for identical values"""
+    text = '\x1f'.join('' if value is None else str(value) for value in row)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def ingest_generation(conn):
+    """Current ingest generation: changes whenever a load has written or deleted bills"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT generation FROM ingest_state WHERE id = 1")
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else 0
+
+
+def bump_generation(cursor):
+    """Mark billing_records as changed, in the same transaction as the change"""
+    cursor.execute("UPDATE ingest_state SET generation = generation + 1 WHERE id = 1")
+
+
+def iter_batches(df, batch_size=1000):
+    """Yield lists of typed row tuples from a billing DataFrame, batch_size rows at a time"""
+    for start in range(0, len(df), batch_size):
+        chunk = df.iloc[start:start + batch_size]
+        columns = [_typed_column(chunk[excel_col], kind) if excel_col in chunk
+                   else [None] * len(chunk)
+                   for excel_col, _, kind in COLUMNS]
+        yield list(zip(*columns))
+
+
+class BulkLoader:
+    """Load billing DataFrames into billing_records in typed batches.
+
+    Each row is written with a hash of its values. With diff=True (the
+    default) the stored hashes of a batch's bills are fetched first and only
+    new or changed rows are written; diff=False rewrites every row. Batches
+    and deletes that change the table bump the ingest generation.
+    """
+
+    def __init__(self, conn, batch_size=1000, method=None, dialect='mysql',
+                 table='billing_records', rollups=None, metrics=None, diff=True):
+        self.backend = get_backend(dialect)
+        method = method or self.backend.default_load_method
+        if method not in LOAD_METHODS:
+            raise ValueError(f"Unknown load method: {method}")
+        if method not in self.backend.load_methods:
+            raise ValueError(f"Load method {method} is not available on {dialect}")
+        self.conn = conn
+        self.batch_size = batch_size
+        self.method = method
+        self.dialect = dialect
+        self.table = table
+        self.rollups = rollups
+        self.metrics = metrics or Instrumentation()
+        self.diff = diff
+        self.placeholder = self.backend.placeholder
+
+    def _upsert_clause(self):
+        """Conflict clause overwriting every column of an existing bill"""
+        return self.backend.upsert_clause(['bill_no'], WRITE_COLUMNS[1:])
+
+    def _insert_sql(self, num_rows=1):
+        row = "(" + ", ".join([self.placeholder] * len(WRITE_COLUMNS)) + ")"
+        return (f"INSERT INTO {self.table} ({', '.join(WRITE_COLUMNS)}) "
+                f"VALUES {', '.join([row] * num_rows)} {self._upsert_clause()}")
+
+    def _write_batch(self, cursor, rows):
+        if self.method == 'executemany':
+            cursor.executemany(self._insert_sql(), rows)
+        elif self.method == 'multirow':
+            params = [value for row in rows for value in row]
+            cursor.execute(self._insert_sql(len(rows)), params)
+        elif self.method == 'dataframe':
+            self._insert_frame(cursor, rows)
+        else:
+            self._load_data(cursor, rows)
+
+    def _insert_frame(self, cursor, rows):
+        """Upsert the batch with one INSERT ... SELECT over a registered DataFrame (DuckDB)"""
+        frame = pd.DataFrame(rows, columns=WRITE_COLUMNS, dtype=object)
+        cursor.register('incoming_batch', frame)
+        try:
+            cursor.execute(
+                f"INSERT INTO {self.table} ({', '.join(WRITE_COLUMNS)}) "
+                f"SELECT {', '.join(WRITE_COLUMNS)} FROM incoming_batch {self._upsert_clause()}")
+        finally:
+            cursor.unregister('incoming_batch')
+
+    def _load_data(self, cursor, rows):
+        """Stage a batch through LOAD DATA LOCAL INFILE, then upsert from the staging table"""
+        staging = f"{self.table}_staging"
+        # Built from a query rather than LIKE: a temporary table cannot be
+        # partitioned, as billing_records is after migrate --partition
+        cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} AS "
+                       f"SELECT {', '.join(WRITE_COLUMNS)} FROM {self.table} WHERE 1 = 0")
+        cursor.execute(f"TRUNCATE TABLE {staging}")
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                for row in rows:
+                    writer.writerow(['\\N' if v is None else v for v in row])
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' INTO TABLE {staging} "
+                f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                f"LINES TERMINATED BY '\\r\\n' ({', '.join(WRITE_COLUMNS)})")
+            cursor.execute(
+                f"INSERT INTO {self.table} ({', '.join(WRITE_COLUMNS)}) "
+                f"SELECT {', '.join(WRITE_COLUMNS)} FROM {staging} {self._upsert_clause()}")
+        finally:
+            os.remove(path)
+
+    def _write_rows_individually(self, cursor, rows):
+        """Fallback for a failed batch: insert row by row and collect the rejects.
+
+        Where a failed statement aborts the transaction (DuckDB) each row is
+        committed or rolled back on its own.
+        """
+        loaded, rejects = 0, []
+        sql = self._insert_sql()
+        for row in rows:
+            try:
+                cursor.execute(sql, row)
+                loaded += 1
+                if not self.backend.statement_rollback:
+                    self.conn.commit()
+            except Exception as e:
+                rejects.append((row[0], str(e)))
+                if not self.backend.statement_rollback:
+                    self.conn.rollback()
+        return loaded, rejects
+
+    def _stored_rows(self, cursor, bill_nos):
+        """{bill_no: (branch, row_hash)} of the given bills already in the table"""
+        bill_nos = list(bill_nos)
+        stored = {}
+        for start in range(0, len(bill_nos), 1000):
+            chunk = bill_nos[start:start + 1000]
+            cursor.execute(f"SELECT bill_no, branch, row_hash FROM {self.table} WHERE bill_no IN "
+                           f"({', '.join([self.placeholder] * len(chunk))})", chunk)
+            stored.update((bill_no, (branch, digest))
+                          for bill_no, branch, digest in cursor.fetchall())
+        return stored
+
+    def load_batch(self, rows, batch_no=0):
+        """Load one batch of typed rows and commit it.
+
+        Rows whose hash matches the stored row are skipped when diffing; the
+        result counts inserted, updated, unchanged and rejected bills. A bill
+        number already stored for another branch is rejected rather than
+        overwriting that branch's bill; one stored without a branch is
+        overwritten.
+        """
+        start = time.perf_counter()
+        cursor = self.conn.cursor()
+        total = len(rows)
+        with self.metrics.stage('diff', rows_in=total) as stage:
+            rows = [row + (row_hash(row),) for row in rows]
+            stored = self._stored_rows(cursor, {row[0] for row in rows})
+            # A bill stored without a branch (loaded before branches were
+            # recorded, or from the top of the folder) is claimed, not a conflict
+            conflicts = [(row[0], f"branch_conflict: stored for branch {stored[row[0]][0]}")
+                         for row in rows
+                         if row[0] in stored and None not in (stored[row[0]][0], row[BRANCH_INDEX])
+                         and stored[row[0]][0] != row[BRANCH_INDEX]]
+            if conflicts:
+                conflicting = {bill_no for bill_no, _ in conflicts}
+                rows = [row for row in rows if row[0] not in conflicting]
+            if self.diff:
+                hashes = {bill_no: digest for bill_no, (_, digest) in stored.items()}
+                unchanged = sum(1 for row in rows if hashes.get(row[0]) == row[-1])
+                rows = [row for row in rows if hashes.get(row[0]) != row[-1]]
+            else:
+                unchanged = 0
+            stage.rows_out += len(rows)
+        loaded, rejects = 0, []
+        if rows:
+            bill_nos = {row[0] for row in rows}
+            before = None
+            if self.rollups:
+                with self.metrics.stage('rollups'):
+                    before = self.rollups.snapshot(cursor, bill_nos)
+            with self.metrics.stage('insert', rows_in=len(rows)) as stage:
+                try:
+                    self._write_batch(cursor, rows)
+                    loaded = len(rows)
+                except Exception as e:
+                    logger.warning("batch %d failed (%s); writing its %d rows one by one",
+                                   batch_no, e, len(rows))
+                    self.conn.rollback()
+                    loaded, rejects = self._write_rows_individually(cursor, rows)
+                stage.rows_out += loaded
+            if self.rollups:
+                with self.metrics.stage('rollups'):
+                    self.rollups.apply(cursor, before, self.rollups.snapshot(cursor, bill_nos))
+            if loaded:
+                bump_generation(cursor)
+        rejected = {bill_no for bill_no, _ in rejects}
+        written = {row[0] for row in rows} - rejected
+        updated = sum(1 for bill_no in written if bill_no in stored)
+        with self.metrics.stage('commit'):
+            self.conn.commit()
+        cursor.close()
+        return BatchResult(batch_no, total, loaded, time.perf_counter() - start,
+                           conflicts + rejects,
+                           inserted=len(written) - updated, updated=updated, unchanged=unchanged)
+
+    def delete(self, bill_nos):
+        """Delete records by Bill_No in batches, returning the number of rows removed"""
+        bill_nos = sorted(bill_nos)
+        deleted = 0
+        cursor = self.conn.cursor()
+        for start in range(0, len(bill_nos), self.batch_size):
+            chunk = bill_nos[start:start + self.batch_size]
+            if self.rollups:
+                self.rollups.apply(cursor, self.rollups.snapshot(cursor, chunk), [])
+            cursor.execute(f"DELETE FROM {self.table} WHERE bill_no IN "
+                           f"({', '.join([self.placeholder] * len(chunk))})", chunk)
+            deleted += cursor.rowcount
+        if deleted:
+            bump_generation(cursor)
+        self.conn.commit()
+        cursor.close()
+        return deleted
+
+    def load(self, df, on_batch=None):
+        """Load a whole DataFrame, calling on_batch(BatchResult) after each batch"""
+        result = LoadResult()
+        for batch_no, rows in enumerate(iter_batches(df, self.batch_size), start=1):
+            batch = self.load_batch(rows, batch_no)
+            result.batches.append(batch)
+            if on_batch:
+                on_batch(batch)
+        return result
@@ -1,11 +1,21 @@
-import pandas as pd
-import numpy as np
-import random
-from datetime import datetime, timedelta
+"""Generate synthetic monthly billing workbooks.
+
+With no arguments this writes the 12 sample workbooks for 2024 (50-80 bills
+each) into monthly_billing_data/. Larger, reproducible data sets for
+benchmarking can be generated across branches and years:
+
+    python app/dataset_generator.py --years 2022 2023 2024 --branches 5 \
+        --rows 20000 40000 --seed 42 --output big_billing_data
+
+All columns are drawn with NumPy in one pass per workbook. --dup-rate,
+--nan-rate and --bad-total-rate control how many repeated rows, missing
+contact numbers and inconsistent totals are mixed in.
+"""
+import argparse
 import os
 
-# Create directory for monthly Excel files
-os.makedirs('monthly_billing_data', exist_ok=True)
+import numpy as np
+import pandas as pd
 
 # Sample data configuration
 customer_names = [
@@ -22,108 +32,130 @@ jewelry_items = [
     'Gold Bangle', 'Silver Bangle', 'Nose Pin', 'Mangalsutra', 'Gold Pendant'
 ]
 
-months = ['January', 'February', 'March', 'April', 'May', 'June', 
+payment_modes = ['Cash', 'Card', 'UPI', 'Bank Transfer']
+
+months = ['January', 'February', 'March', 'April', 'May', 'June',
           'July', 'August', 'September', 'October', 'November', 'December']
 
-def generate_monthly_data(month_num, year=2024):
-    """Generate billing data for a specific month"""
-    month_name = months[month_num - 1]
-    
-    # Random number of transactions per month (50-80)
-    num_transactions = random.randint(50, 80)
-    
-    data = {
-        'Bill_No': [],
-        'Date': [],
-        'Customer_Name': [],
-        'Contact_Number': [],
-        'Item_Name': [],
-        'Quantity': [],
-        'Weight_Grams': [],
-        'Rate_Per_Gram': [],
-        'Making_Charges': [],
-        'Total_Amount': [],
-        'Payment_Mode': []
-    }
-    
-    for i in range(num_transactions):
-        # Generate date within the month
-        day = random.randint(1, 28 if month_num == 2 else 30 if month_num in [4,6,9,11] else 31)
-        date = datetime(year, month_num, day).strftime('%Y-%m-%d')
-        
-        # Generate bill number
-        bill_no = f"JB{year}{month_num:02d}{i+1:04d}"
-        
-        # Random customer
-        customer = random.choice(customer_names)
-        contact = f"+91 {''.join([str(random.randint(0,9)) for _ in range(10)])}"
-        
-        # Random item
-        item = random.choice(jewelry_items)
-        quantity = random.randint(1, 3)
-        
-        # Weight and pricing based on item type
-        if 'Gold' in item:
-            weight = round(random.uniform(5, 50), 2)
-            rate = round(random.uniform(5500, 6000), 2)
-            making_charges = round(weight * random.uniform(400, 600), 2)
-        elif 'Silver' in item:
-            weight = round(random.uniform(10, 100), 2)
-            rate = round(random.uniform(70, 85), 2)
-            making_charges = round(weight * random.uniform(50, 100), 2)
-        elif 'Diamond' in item:
-            weight = round(random.uniform(2, 20), 2)
-            rate = round(random.uniform(3000, 5000), 2)
-            making_charges = round(weight * random.uniform(1000, 2000), 2)
-        else:
-            weight = round(random.uniform(5, 30), 2)
-            rate = round(random.uniform(5000, 6000), 2)
-            making_charges = round(weight * random.uniform(300, 500), 2)
-        
-        # Calculate total
-        total = round((weight * rate * quantity) + making_charges, 2)
-        
-        # Payment mode
-        payment = random.choice(['Cash', 'Card', 'UPI', 'Bank Transfer'])
-        
-        # Append to data
-        data['Bill_No'].append(bill_no)
-        data['Date'].append(date)
-        data['Customer_Name'].append(customer)
-        data['Contact_Number'].append(contact)
-        data['Item_Name'].append(item)
-        data['Quantity'].append(quantity)
-        data['Weight_Grams'].append(weight)
-        data['Rate_Per_Gram'].append(rate)
-        data['Making_Charges'].append(making_charges)
-        data['Total_Amount'].append(total)
-        data['Payment_Mode'].append(payment)
-    
-    return pd.DataFrame(data)
-
-# Generate data for all 12 months
-print("Generating monthly billing data for 2024...")
-for month_num in range(1, 13):
-    df = generate_monthly_data(month_num)
-    
-    # Add some realistic data quality issues for preprocessing demonstration
-    # Random missing values (2-3%)
-    if random.random() > 0.5:
-        missing_idx = random.sample(range(len(df)), k=random.randint(1, 3))
-        df.loc[missing_idx, 'Contact_Number'] = np.nan
-    
-    # Random duplicates (1-2 rows)
-    if random.random() > 0.7:
-        dup_idx = random.sample(range(len(df)), k=random.randint(1, 2))
-        df = pd.concat([df, df.iloc[dup_idx]], ignore_index=True)
-    
-    # Save to Excel
-    filename = f'monthly_billing_data/{months[month_num-1]}_2024.xlsx'
-    df.to_excel(filename, index=False)
-    print(f"✓ Created {filename} with {len(df)} records")
-
-print("\n✅ All monthly Excel files generated successfully!")
-print(f"📁 Files saved in: monthly_billing_data/")
-print("\nSample data from January 2024:")
-jan_df = pd.read_excel('monthly_billing_data/January_2024.xlsx')
-print(jan_df.head())
\ No newline at end of file
+# (weight range g, rate range per g, making charge range per g) by item family
+PRICING = {
+    'Gold': ((5, 50), (5500, 6000), (400, 600)),
+    'Silver': ((10, 100), (70, 85), (50, 100)),
+    'Diamond': ((2, 20), (3000, 5000), (1000, 2000)),
+    'Other': ((5, 30), (5000, 6000), (300, 500)),
+}
+
+
+def _family(item):
+    return next((family for family in ('Gold', 'Silver', 'Diamond') if family in item), 'Other')
+
+
+ITEM_FAMILIES = np.array([list(PRICING).index(_family(item)) for item in jewelry_items])
+
+
+def _uniform(rng, bounds, families):
+    """Per-row uniform draw whose (low, high) depends on each row's item family"""
+    low = np.array([PRICING[f][bounds][0] for f in PRICING])[families]
+    high = np.array([PRICING[f][bounds][1] for f in PRICING])[families]
+    return low + rng.random(len(families)) * (high - low)
+
+
+def generate_monthly_data(month_num, year=2024, rows=None, rng=None, branch=None):
+    """Generate billing data for a specific month (and branch) as a clean DataFrame"""
+    rng = rng if rng is not None else np.random.default_rng()
+    rows = rows if rows is not None else int(rng.integers(50, 81))
+
+    days = pd.Period(year=year, month=month_num, freq='M').days_in_month
+    dates = pd.Timestamp(year, month_num, 1) + pd.to_timedelta(rng.integers(0, days, rows), unit='D')
+
+    prefix = f"JB{branch or ''}{year}{month_num:02d}"
+    width = max(4, len(str(rows)))
+    bill_nos = np.char.add(prefix, np.char.zfill(np.arange(1, rows + 1).astype('U'), width))
+
+    items = rng.integers(0, len(jewelry_items), rows)
+    families = ITEM_FAMILIES[items]
+    weight = _uniform(rng, 0, families).round(2)
+    rate = _uniform(rng, 1, families).round(2)
+    making = (weight * _uniform(rng, 2, families)).round(2)
+    quantity = rng.integers(1, 4, rows)
+
+    return pd.DataFrame({
+        'Bill_No': bill_nos,
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Customer_Name': np.array(customer_names)[rng.integers(0, len(customer_names), rows)],
+        'Contact_Number': np.char.add('+91 ', np.char.zfill(
+            rng.integers(0, 10_000_000_000, rows).astype('U'), 10)),
+        'Item_Name': np.array(jewelry_items)[items],
+        'Quantity': quantity,
+        'Weight_Grams': weight,
+        'Rate_Per_Gram': rate,
+        'Making_Charges': making,
+        'Total_Amount': (weight * rate * quantity + making).round(2),
+        'Payment_Mode': np.array(payment_modes)[rng.integers(0, len(payment_modes), rows)],
+    })
+
+
+def add_quality_issues(df, rng, dup_rate=0.0, nan_rate=0.0, bad_total_rate=0.0):
+    """Blank out contact numbers, corrupt totals and append repeated rows at the given rates"""
+    df = df.copy()
+    df['Contact_Number'] = df['Contact_Number'].astype(object)
+    df.loc[rng.random(len(df)) < nan_rate, 'Contact_Number'] = np.nan
+    bad = rng.random(len(df)) < bad_total_rate
+    df.loc[bad, 'Total_Amount'] = (df.loc[bad, 'Total_Amount']
+                                   * rng.uniform(1.1, 2.0, bad.sum())).round(2)
+    dups = int(round(len(df) * dup_rate))
+    if dups:
+        df = pd.concat([df, df.iloc[rng.choice(len(df), dups, replace=False)]],
+                       ignore_index=True)
+    return df
+
+
+def generate_workbooks(years=(2024,), branches=1, rows=(50, 80), seed=None,
+                       dup_rate=0.0, nan_rate=0.0, bad_total_rate=0.0):
+    """Yield (branch, year, month, DataFrame) for every workbook of a synthetic data set"""
+    rng = np.random.default_rng(seed)
+    for branch in range(1, branches + 1):
+        code = f"B{branch:02d}" if branches > 1 else None
+        for year in years:
+            for month_num in range(1, 13):
+                count = int(rng.integers(rows[0], rows[1] + 1))
+                df = generate_monthly_data(month_num, year, count, rng, code)
+                yield code, year, month_num, add_quality_issues(
+                    df, rng, dup_rate, nan_rate, bad_total_rate)
+
+
+def workbook_name(branch, year, month_num):
+    name = f"{months[month_num - 1]}_{year}.xlsx"
+    return f"{branch}_{name}" if branch else name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='monthly_billing_data')
+    parser.add_argument('--years', type=int, nargs='+', default=[2024])
+    parser.add_argument('--branches', type=int, default=1)
+    parser.add_argument('--rows', type=int, nargs=2, default=[50, 80], metavar=('MIN', 'MAX'),
+                        help="bills per workbook")
+    parser.add_argument('--seed', type=int, help="seed for a reproducible data set")
+    parser.add_argument('--dup-rate', type=float, default=0.01)
+    parser.add_argument('--nan-rate', type=float, default=0.02)
+    parser.add_argument('--bad-total-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    print(f"Generating billing data for {', '.join(map(str, args.years))}...")
+    total = 0
+    for branch, year, month_num, df in generate_workbooks(
+            args.years, args.branches, args.rows, args.seed,
+            args.dup_rate, args.nan_rate, args.bad_total_rate):
+        filename = os.path.join(args.output, workbook_name(branch, year, month_num))
+        df.to_excel(filename, index=False)
+        total += len(df)
+        print(f"✓ Created {filename} with {len(df)} records")
+
+    print(f"\n✅ {total:,} records generated successfully!")
+    print(f"📁 Files saved in: {args.output}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+
+from backends import DB_ERRORS, get_backend
+
+
+class LatencyStats:
+    """Running count/total/max of operation latencies in seconds"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class LocalPool:
+    """Minimal connection pool for file databases with the same get_connection() shape as MySQL's.
+
+    With keep_idle=False released connections are closed rather than reused,
+    and the pool only bounds how many are open at once.
+    """
+
+    def __init__(self, connect, pool_size=4, keep_idle=True):
+        self.connect = connect
+        self.keep_idle = keep_idle
+        self.idle = queue.Queue()
+        self.slots = threading.Semaphore(pool_size)
+
+    def get_connection(self):
+        if not self.slots.acquire(timeout=0):
+            raise PoolError("Connection pool exhausted")
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.connect()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, conn):
+        if self.keep_idle:
+            self.idle.put(conn)
+        else:
+            conn.close()
+        self.slots.release()
+
+    def discard(self, conn):
+        conn.close()
+        self.slots.release()
+
+
+class Database:
+    """Pooled connections with health checks, retry/backoff and latency metrics"""
+
+    def __init__(self, config, pool_size=None, retries=3, backoff=0.2):
+        self.dialect = config.get('db_backend', 'mysql')
+        self.backend = get_backend(self.dialect)
+        self.retries = retries
+        self.backoff = backoff
+        self.connect_stats = LatencyStats()
+        self.query_stats = LatencyStats()
+        self.config = dict(config)
+        self.pool_lock = threading.Lock()
+        self.pool_size = pool_size or config.get('pool_size', 4)
+        self.pool = None
+
+    def _create_pool(self):
+        if self.dialect != 'mysql':
+            return LocalPool(lambda: self.backend.connect(self.config), self.pool_size,
+                             keep_idle=self.backend.pool_connections)
+        return pooling.MySQLConnectionPool(
+            pool_name=f"billing_{id(self)}",
+            pool_size=self.pool_size,
+            host=self.config['db_host'],
+            user=self.config['db_user'],
+            password=self.config['db_password'],
+            database=self.config['db_name'],
+            allow_local_infile=self.config.get('load_method') == 'load_data',
+        )
+
+    def _checkout(self):
+        """Borrow a healthy connection, retrying with exponential backoff"""
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            conn = None
+            try:
+                with self.pool_lock:
+                    if self.pool is None:
+                        self.pool = self._create_pool()
+                conn = self.pool.get_connection()
+                self.backend.ping(conn)
+                self.connect_stats.add(time.perf_counter() - start)
+                return conn
+            except DB_ERRORS:
+                if conn is not None:
+                    self._discard(conn)
+                if attempt == self.retries:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def _release(self, conn):
+        if self.dialect != 'mysql':
+            self.pool.release(conn)
+        else:
+            conn.close()  # returns a pooled connection to the pool
+
+    def _discard(self, conn):
+        """Drop a connection that failed its health check"""
+        if self.dialect != 'mysql':
+            self.pool.discard(conn)
+            return
+        try:
+            conn.close()
+        except DB_ERRORS:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block"""
+        conn = self._checkout()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                if getattr(conn, 'unread_result', False):
+                    conn.consume_results()
+                conn.rollback()
+            except DB_ERRORS:
+                self._discard(conn)
+            else:
+                self._release(conn)
+            raise
+        self._release(conn)
+
+    def query(self, sql, params=()):
+        """Run a SELECT on a pooled connection and return all rows"""
+        with self.connection() as conn:
+            start = time.perf_counter()
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            self.query_stats.add(time.perf_counter() - start)
+            return rows
+
+    def metrics(self):
+        """Connect and query latency figures"""
+        return {'connect': self.connect_stats.as_dict(), 'query': self.query_stats.as_dict()}
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(config):
+    """Shared Database for the given connection settings, created on first use"""
+    key = (config.get('db_backend', 'mysql'), config.get('sqlite_path'),
+           config.get('duckdb_path'), config.get('db_host'),
+           config.get('db_user'), config.get('db_password'), config.get('db_name'),
+           config.get('pool_size', 4), config.get('load_method') == 'load_data')
+    with _databases_lock:
+        if key not in _databases:
+            _databases[key] = Database(config)
+        return _databases[key]
@@ -0,0 +1,530 @@
+"""Read/clean/load/export pipeline shared by the Tk app and the command line.
+
+Nothing in here imports tkinter, so it can run on servers without a display.
+"""
+import json
+import os
+import pickle
+import shutil
+from contextlib import ExitStack
+from datetime import date
+
+import pandas as pd
+
+import migrations
+from backends import get_backend
+from bulk_loader import BulkLoader, LoadResult, bump_generation, ingest_generation
+from db import get_database
+from exporter import YearlyExport, fetch_summary, write_workbook
+from instrumentation import Instrumentation
+from manifest import IngestManifest
+from pipeline import pipelined
+from report_cache import get_report_cache
+from rollups import RollupMaintainer, check_rollups, rebuild_rollups
+from sources import discover
+from staging_cache import StagingCache
+from streaming_reader import StreamingReader
+from validation import bill_key, validate, write_rejects
+
+DEFAULT_CONFIG = {
+    'folder_path': '',
+    'include_patterns': ['*.xlsx'],
+    'exclude_patterns': ['~$*'],
+    'recursive': True,
+    'discovery_workers': 16,
+    'db_host': 'localhost',
+    'db_user': 'root',
+    'db_password': '',
+    'db_name': 'jewelry_shop',
+    'batch_size': 1000,
+    'load_method': None,  # None: the backend's own bulk path
+    'upsert_mode': 'diff',
+    'workers': None,
+    'streaming': False,
+    'pipeline': True,
+    'queue_depth': 4,
+    'chunk_size': 5000,
+    'manifest_path': 'manifest.pkl',
+    'db_backend': 'mysql',
+    'sqlite_path': 'jewelry_shop.db',
+    'duckdb_path': 'jewelry_shop.duckdb',
+    'pool_size': 4,
+    'export_chunk_size': 10000,
+    'report_cache_dir': 'report_cache',
+    'report_cache_ttl': 3600,  # seconds; 0 disables the report cache
+    'report_cache_max_mb': 256,
+    'validation_limits': None,
+    'reject_dir': 'rejects',
+    'reject_format': 'csv',
+    'preview_index_path': 'preview_index.pkl',
+    'preview_rows': 10,
+    'staging_cache_dir': 'staging_cache',
+    'staging_cache_format': 'arrow',
+    'staging_cache_max_mb': 1024,
+}
+
+ENV_PREFIX = 'BILLING_'
+
+class NullProgress:
+    """Progress sink used when nobody is watching"""
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+def _coerce(key, value):
+    """Convert an environment string to the type of the matching default"""
+    default = DEFAULT_CONFIG.get(key)
+    if isinstance(default, bool):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, int) or key == 'workers':
+        return int(value)
+    if isinstance(default, list):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return value
+
+
+def load_config(path=None, environ=None):
+    """Build a config from defaults, an optional .pkl/.json file and BILLING_* variables"""
+    environ = os.environ if environ is None else environ
+    config = dict(DEFAULT_CONFIG)
+    path = path or environ.get(ENV_PREFIX + 'CONFIG')
+    if path:
+        if path.endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                config.update(json.load(f))
+        else:
+            with open(path, 'rb') as f:
+                config.update(pickle.load(f))
+    for key in DEFAULT_CONFIG:
+        env_key = ENV_PREFIX + key.upper()
+        if env_key in environ:
+            config[key] = _coerce(key, environ[env_key])
+    return config
+
+
+def connect(config, database=True):
+    """Open a one-off connection to the configured backend (pooled work goes through db.get_database)"""
+    return get_backend(config.get('db_backend', 'mysql')).connect(config, database)
+
+
+def test_connection(config):
+    """Create the database if needed, connect and bring the schema up to date"""
+    db = get_database(config)
+    db.backend.create_database(config)
+    with db.connection() as conn:
+        ensure_schema(conn, db.dialect)
+    return db.dialect
+
+
+def discover_sources(config, folder=None):
+    """Workbooks below folder (default: folder_path) that match the configured patterns"""
+    return discover(folder or config.get('folder_path'),
+                    include=config.get('include_patterns'),
+                    exclude=config.get('exclude_patterns'),
+                    recursive=config.get('recursive', True),
+                    workers=config.get('discovery_workers', 16))
+
+
+def tag_source(df, source):
+    """Add the Branch and Source_File columns of the workbook df was read from"""
+    return df.assign(Branch=source.branch, Source_File=source.rel_path)
+
+
+def staging_cache(config):
+    """The parsed-workbook cache configured for this run"""
+    return StagingCache(config.get('staging_cache_dir', 'staging_cache'),
+                        max_bytes=config.get('staging_cache_max_mb', 1024) << 20,
+                        fmt=config.get('staging_cache_format', 'arrow'))
+
+
+def load_manifest(config):
+    """The ingest manifest entries for the configured database"""
+    return IngestManifest.load(config.get('manifest_path', 'manifest.pkl'),
+                               get_backend(config.get('db_backend', 'mysql')).location(config))
+
+
+def report_cache(config):
+    """The shared report cache configured for this process, or None when it is disabled"""
+    ttl = config.get('report_cache_ttl', 3600)
+    if not ttl:
+        return None
+    return get_report_cache(config.get('report_cache_dir', 'report_cache'), ttl,
+                            config.get('report_cache_max_mb', 256) << 20)
+
+
+def ensure_schema(conn, dialect='mysql'):
+    """Create or upgrade the billing tables; returns the migration versions applied"""
+    return migrations.migrate(conn, dialect)
+
+
+def ingest(config, folder=None, progress=None, metrics=None):
+    """Read, clean and load new or changed workbooks from folder; returns a run summary dict.
+
+    Per-stage timings are collected in metrics (an Instrumentation) and
+    included in the summary under 'stages'.
+    """
+    progress = progress or NullProgress()
+    metrics = metrics or Instrumentation()
+    folder = folder or config.get('folder_path')
+    if not folder or not os.path.isdir(folder):
+        raise FileNotFoundError(f"Folder not found: {folder}")
+
+    # Get all Excel files and skip the ones already ingested unchanged
+    progress.update("Checking files")
+    with metrics.stage('discover') as stage:
+        sources = {source.path: source for source in discover_sources(config, folder)}
+        excel_files = list(sources)
+        manifest = load_manifest(config)
+        changed_files, unchanged_files, removed_files = manifest.plan(excel_files)
+        for key in removed_files:
+            manifest.forget(key)
+        stage.rows_out += len(changed_files)
+
+    summary = {
+        'files_processed': len(changed_files),
+        'files_unchanged': len(unchanged_files),
+        'records_loaded': 0,
+        'records_inserted': 0,
+        'records_updated': 0,
+        'records_unchanged': 0,
+        'records_deleted': 0,
+        'records_invalid': 0,
+        'records_duplicate': 0,
+        'records_rejected': 0,
+        'rows_per_sec': 0.0,
+        'reject_file': None,
+        'rejects': [],
+        'stages': [],
+    }
+    if not changed_files:
+        manifest.save()
+        summary['stages'] = metrics.as_dicts()
+        return summary
+
+    db = get_database(config)
+    with ExitStack() as stack:
+        with metrics.stage('connect'):
+            conn = stack.enter_context(db.connection())
+        with metrics.stage('ddl'):
+            ensure_schema(conn, db.dialect)
+        loader = BulkLoader(conn, batch_size=config.get('batch_size', 1000),
+                            method=config.get('load_method'), dialect=db.dialect,
+                            rollups=RollupMaintainer(db.dialect), metrics=metrics,
+                            diff=config.get('upsert_mode', 'diff') == 'diff')
+        progress.update(files_total=len(changed_files))
+        invalid_frames = []
+        # Digests of every Bill_No read this run: a bill already seen in an
+        # earlier file or chunk is rejected as a duplicate in every mode
+        seen = set()
+        # Bills dropped from edited workbooks, for modes that record files as they go
+        dropped_bills = set()
+
+        if config.get('streaming'):
+            # Stream chunks straight from the sheets into the database, one
+            # file at a time; only the current file's bill numbers are held
+            reader = StreamingReader(chunk_size=config.get('chunk_size', 5000))
+            result = LoadResult()
+            for done, file in enumerate(changed_files, start=1):
+                file_bills = set()
+                first_batch = len(result.batches)
+                chunks = metrics.iterate('parse', reader.iter_file(file), rows=len)
+                for chunk in chunks:
+                    chunk = tag_source(chunk, sources[file])
+                    file_bills.update(chunk['Bill_No'].dropna().astype(str))
+                    with metrics.stage('clean', rows_in=len(chunk)) as stage:
+                        chunk, invalid = validate(chunk, config.get('validation_limits'), seen)
+                        stage.rows_out += len(chunk)
+                    invalid_frames.append(invalid)
+                    result.batches.extend(loader.load(chunk).batches)
+                    progress.update(f"Loading {os.path.basename(file)}",
+                                    rows_loaded=result.loaded)
+                bills = pd.DataFrame({'Bill_No': sorted(file_bills)})
+                dropped_bills |= manifest.deleted_bills(file, bills)
+                file_rejects = {str(b) for batch in result.batches[first_batch:]
+                                for b, _ in batch.rejects}
+                if file_rejects.isdisjoint(file_bills):
+                    manifest.record(file, bills)
+                progress.update(files_done=done)
+            all_data = {}
+        elif config.get('pipeline', True):
+            # Parse and clean on a producer thread while this thread loads, file by file
+            depth = config.get('queue_depth', 4)
+
+            def produce():
+                parsed = metrics.iterate(
+                    'parse', staging_cache(config).iter_many(
+                        changed_files, workers=config.get('workers'), prefetch=depth),
+                    rows=lambda item: len(item[1]))
+                for file, df in parsed:
+                    df = tag_source(df, sources[file])
+                    bills = pd.DataFrame({'Bill_No': df['Bill_No'].dropna().astype(str)})
+                    with metrics.stage('clean', rows_in=len(df)) as stage:
+                        df, invalid = validate(df, config.get('validation_limits'), seen)
+                        stage.rows_out += len(df)
+                    yield file, bills, df, invalid
+
+            result = LoadResult()
+            all_data = {}
+            loaded = []
+
+            def on_batch(batch):
+                loaded.append(batch.rows)
+                progress.update(rows_loaded=sum(loaded))
+
+            for done, (file, bills, df, invalid) in enumerate(
+                    pipelined(produce(), depth, metrics), start=1):
+                all_data[file] = bills
+                invalid_frames.append(invalid)
+                result.batches.extend(loader.load(df, on_batch=on_batch).batches)
+                progress.update(f"Loaded {os.path.basename(file)}", files_done=done)
+        else:
+            # Read and combine new or modified files
+            parsed = []
+
+            def on_file(file, df):
+                parsed.append(file)
+                progress.update(f"Parsed {os.path.basename(file)}", files_done=len(parsed))
+
+            with metrics.stage('parse', rows_in=len(changed_files)) as stage:
+                frames = staging_cache(config).read_many(changed_files,
+                                                         workers=config.get('workers'),
+                                                         on_file=on_file)
+                frames = [tag_source(df, sources[file]) for file, df in zip(changed_files, frames)]
+                stage.rows_out += sum(len(df) for df in frames)
+            all_data = dict(zip(changed_files, frames))
+
+            with metrics.stage('concat', rows_in=sum(len(df) for df in frames)) as stage:
+                combined_df = pd.concat(all_data.values(), ignore_index=True)
+                seen.update(bill_key(b) for b in combined_df['Bill_No'].dropna())
+                stage.rows_out += len(combined_df)
+
+            # Validate and clean in one vectorized pass
+            with metrics.stage('clean', rows_in=len(combined_df)) as stage:
+                combined_df, invalid = validate(combined_df, config.get('validation_limits'))
+                stage.rows_out += len(combined_df)
+            invalid_frames.append(invalid)
+
+            # Bulk insert data in typed batches
+            progress.update("Loading records", rows_total=len(combined_df))
+            loaded = []
+
+            def on_batch(batch):
+                loaded.append(batch.rows)
+                progress.update(rows_loaded=sum(loaded))
+
+            result = loader.load(combined_df, on_batch=on_batch)
+
+        # Rows removed from an edited workbook and not present anywhere else
+        with metrics.stage('delete') as stage:
+            deleted_bills = dropped_bills
+            for file, df in all_data.items():
+                deleted_bills |= manifest.deleted_bills(file, df)
+            deleted_bills = {bill_no for bill_no in deleted_bills if bill_key(bill_no) not in seen}
+            if deleted_bills:
+                deleted_bills -= manifest.recorded_elsewhere(deleted_bills,
+                                                             exclude=changed_files)
+            delete_count = loader.delete(deleted_bills) if deleted_bills else 0
+            stage.rows_out += delete_count
+
+    # Remember loaded files; files with rejected rows are retried next run
+    with metrics.stage('manifest'):
+        rejected_bills = {str(bill_no) for bill_no, _ in result.rejects}
+        for file, df in all_data.items():
+            if rejected_bills.isdisjoint(df['Bill_No'].dropna().astype(str)):
+                manifest.record(file, df)
+        manifest.save()
+
+    # Invalid rows go to a reject file with their reason codes
+    invalid = (pd.concat(invalid_frames, ignore_index=True) if invalid_frames
+               else pd.DataFrame(columns=['Bill_No', 'Reject_Reason']))
+    # Rows the database refused (or that clash with another branch) go with them
+    refused = pd.DataFrame([(str(bill_no), reason) for bill_no, reason in result.rejects],
+                           columns=['Bill_No', 'Reject_Reason'])
+    all_rejects = (pd.concat([df for df in (invalid, refused) if len(df)], ignore_index=True)
+                   if len(refused) else invalid)
+    with metrics.stage('rejects', rows_in=len(all_rejects)) as stage:
+        reject_file = write_rejects(all_rejects, config.get('reject_dir', 'rejects'),
+                                    config.get('reject_format', 'csv'))
+        stage.rows_out += len(all_rejects)
+    rejects = [{'bill_no': str(bill_no), 'reason': reason}
+               for bill_no, reason in result.rejects]
+    rejects += [{'bill_no': None if pd.isna(bill_no) else str(bill_no), 'reason': reason}
+                for bill_no, reason in zip(invalid['Bill_No'].head(100),
+                                           invalid['Reject_Reason'].head(100))]
+
+    summary.update({
+        'records_loaded': result.loaded,
+        'records_inserted': result.inserted,
+        'records_updated': result.updated,
+        'records_unchanged': result.unchanged,
+        'records_deleted': delete_count,
+        'records_invalid': len(invalid),
+        'records_duplicate': sum('duplicate_bill_no' in reason.split(';')
+                                 for reason in invalid['Reject_Reason']),
+        'records_rejected': len(result.rejects) + len(invalid),
+        'rows_per_sec': result.rows_per_sec,
+        'reject_file': reject_file,
+        'rejects': rejects,
+        'stages': metrics.as_dicts(),
+    })
+    return summary
+
+
+def load_frame(config, folder=None):
+    """All workbooks in folder as one DataFrame, read through the staging cache.
+
+    Meant for ad-hoc analysis; nothing is validated or written to the database.
+    """
+    sources = discover_sources(config, folder)
+    if not sources:
+        return pd.DataFrame()
+    frames = staging_cache(config).read_many([source.path for source in sources],
+                                             workers=config.get('workers'))
+    return pd.concat([tag_source(df, source) for source, df in zip(sources, frames)],
+                     ignore_index=True)
+
+
+def cache(config, invalidate=None, clear=False, clear_reports=False):
+    """Report on the staging and report caches, after dropping the given workbooks (or everything)"""
+    store = staging_cache(config)
+    removed = 0
+    if clear:
+        removed = store.invalidate()
+    elif invalidate:
+        removed = store.invalidate(invalidate)
+    reports = report_cache(config)
+    reports_removed = reports.clear() if reports and clear_reports else 0
+    return {'removed': removed, **store.stats(), 'reports_removed': reports_removed,
+            'reports': reports.stats() if reports else None}
+
+
+def export_yearly(config, filename, year=None, start_date=None, end_date=None, progress=None,
+                  metrics=None):
+    """Write the yearly workbook to filename; returns the number of records, 0 if there is no data.
+
+    year and/or start_date/end_date limit the export to a date range. While
+    nothing has been ingested since, a repeated export is copied from the
+    report cache (or at least reuses its cached summaries).
+    """
+    progress = progress or NullProgress()
+    metrics = metrics or Instrumentation()
+    progress.update("Summarising records")
+
+    db = get_database(config)
+    export = YearlyExport(db.dialect, year, start_date, end_date)
+    reports = report_cache(config)
+    key = (db.backend.location(config), export.year, export.start, export.end)
+    with ExitStack() as stack:
+        with metrics.stage('connect'):
+            conn = stack.enter_context(db.connection())
+        with metrics.stage('ddl'):
+            ensure_schema(conn, db.dialect)
+        generation = ingest_generation(conn)
+        entry = reports.lookup(key, generation) if reports else None
+        if entry and (entry.path or not entry.records):
+            with metrics.stage('export') as stage:
+                if entry.path:
+                    shutil.copyfile(entry.path, filename)
+                stage.rows_out += entry.records
+            return entry.records
+        if entry:
+            summary = (entry.records, entry.monthly, entry.customers)
+        else:
+            with metrics.stage('summary') as stage:
+                summary = fetch_summary(conn, export)
+                stage.rows_out += summary[0]
+        records = write_workbook(conn, filename, export,
+                                 chunk_size=config.get('export_chunk_size', 10000),
+                                 progress=progress, summary=summary, metrics=metrics)
+    if reports:
+        reports.store(key, generation, *summary, file=filename if records else None)
+    return records
+
+
+def report_cache_stats(config):
+    """Hit/miss figures of this process's report cache, or None when it is disabled"""
+    reports = report_cache(config)
+    return reports.stats() if reports else None
+
+
+def stats(config):
+    """Summary figures for the billing_records table and the ingestion manifest"""
+    db = get_database(config)
+    with db.connection() as conn:
+        ensure_schema(conn, db.dialect)
+    count, first_date, last_date, total = db.query(
+        "SELECT COUNT(*), MIN(date), MAX(date), SUM(total_amount) FROM billing_records")[0]
+    by_year = db.query("SELECT year, SUM(total_amount), SUM(bill_count) FROM monthly_rollup "
+                       "GROUP BY year ORDER BY year")
+    manifest = load_manifest(config)
+    return {
+        'records': count,
+        'first_date': str(first_date) if first_date else None,
+        'last_date': str(last_date) if last_date else None,
+        'total_amount': float(total or 0),
+        'by_year': [{'year': year, 'total_amount': float(amount), 'bills': int(bills)}
+                    for year, amount, bills in by_year if bills],
+        'files_ingested': len(manifest.entries),
+        'db_metrics': db.metrics(),
+    }
+
+
+def migrate(config, partition_years=None):
+    """Apply pending schema migrations, optionally partitioning by year (MySQL only)"""
+    db = get_database(config)
+    with db.connection() as conn:
+        applied = ensure_schema(conn, db.dialect)
+        if partition_years:
+            if db.dialect != 'mysql':
+                raise ValueError("Yearly partitioning is only available on MySQL")
+            migrations.partition_by_year(conn, *partition_years)
+        version = migrations.current_version(conn)
+    return {'applied': applied, 'schema_version': version,
+            'partitioned': bool(partition_years)}
+
+
+def check_indexes(config, year=None):
+    """EXPLAIN the date-filtered export queries; returns the per-query index report.
+
+    The ranged queries (of year, or of the current year when none is given)
+    must use an index. Without a year the export also runs unfiltered
+    aggregates, which read the whole table by design: they are listed as
+    expected scans and not EXPLAINed.
+    """
+    db = get_database(config)
+    export = YearlyExport(db.dialect, year or date.today().year, use_rollups=False)
+    queries = [
+        ('all_records', export.records_sql(), export.params),
+        ('monthly_summary', *export.monthly_summary()),
+        ('top_customers', *export.top_customers()),
+    ]
+    with db.connection() as conn:
+        ensure_schema(conn, db.dialect)
+        report = migrations.explain_indexes(conn, db.dialect, queries)
+    for query in report:
+        query['expected_scan'] = False
+    if year is None:
+        report += [{'query': f"{label}_all_time", 'index': None, 'plan': [],
+                    'expected_scan': True} for label, _, _ in queries]
+    # A backend that scans instead of using indexes has nothing to report missing
+    all_indexed = (all(q['index'] or q['expected_scan'] for q in report)
+                   or not db.backend.uses_indexes)
+    return {'queries': report, 'all_indexed': all_indexed}
+
+
+def rollup_check(config, repair=False):
+    """Verify the rollup tables against a full recompute, optionally rebuilding them"""
+    db = get_database(config)
+    with db.connection() as conn:
+        ensure_schema(conn, db.dialect)
+        mismatches = check_rollups(conn, db.dialect)
+        if mismatches and repair:
+            rebuild_rollups(conn, db.dialect)
+            # Reports built from the rollups are out of date too
+            cursor = conn.cursor()
+            bump_generation(cursor)
+            conn.commit()
+            cursor.close()
+    return {'consistent': not mismatches, 'mismatches': mismatches[:100],
+            'mismatch_count': len(mismatches), 'repaired': bool(mismatches and repair)}
@@ -0,0 +1,160 @@
+import datetime
+
+from openpyxl import Workbook
+
+from backends import get_backend
+from instrumentation import Instrumentation
+
+RECORD_COLUMNS = ('id', 'bill_no', 'date', 'customer_name', 'contact_number', 'item_name',
+                  'quantity', 'weight_grams', 'rate_per_gram', 'making_charges',
+                  'total_amount', 'payment_mode', 'branch', 'source_file', 'source_sheet',
+                  'created_at')
+
+
+def date_range(year=None, start_date=None, end_date=None):
+    """Half-open [start, end) date bounds for a year and/or an explicit range"""
+    start, end = start_date, end_date
+    if year:
+        year_start, year_end = datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+        start = max(start, year_start) if start else year_start
+        end = min(end, year_end) if end else year_end
+    return start, end
+
+
+def where_clause(placeholder, start=None, end=None):
+    """SQL WHERE fragment and parameters for a date range"""
+    conditions, params = [], []
+    if start:
+        conditions.append(f"date >= {placeholder}")
+        params.append(start)
+    if end:
+        conditions.append(f"date < {placeholder}")
+        params.append(end)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+class YearlyExport:
+    """Builds the yearly report queries for one date range and dialect"""
+
+    def __init__(self, dialect='mysql', year=None, start_date=None, end_date=None,
+                 use_rollups=True):
+        self.dialect = dialect
+        self.backend = get_backend(dialect)
+        self.placeholder = self.backend.placeholder
+        self.year = year
+        # Rollups are per calendar month, so they only answer whole-year (or all-time) ranges
+        self.use_rollups = use_rollups and not (start_date or end_date)
+        self.start, self.end = date_range(year, start_date, end_date)
+        self.where, self.params = where_clause(self.placeholder, self.start, self.end)
+        self.params = [self.backend.date_param(value) for value in self.params]
+
+    def count_sql(self):
+        return f"SELECT COUNT(*) FROM billing_records{self.where}"
+
+    def _rollup_filter(self):
+        if self.year:
+            return f" WHERE year = {self.placeholder}", [self.year]
+        return "", []
+
+    def monthly_summary(self):
+        """(sql, params) for the Monthly Summary sheet"""
+        if self.use_rollups:
+            where, params = self._rollup_filter()
+            return (f"SELECT month AS date, SUM(total_amount) AS total_amount, "
+                    f"SUM(bill_count) AS total_transactions FROM monthly_rollup{where} "
+                    f"GROUP BY month HAVING SUM(bill_count) > 0 ORDER BY month"), params
+        month = self.backend.month_expr()
+        return (f"SELECT {month} AS date, SUM(total_amount) AS total_amount, "
+                f"COUNT(bill_no) AS total_transactions FROM billing_records{self.where} "
+                f"GROUP BY {month} ORDER BY {month}"), self.params
+
+    def top_customers(self, limit=10):
+        """(sql, params) for the Top Customers sheet"""
+        if self.use_rollups:
+            where, params = self._rollup_filter()
+            return (f"SELECT customer_name, SUM(total_amount) AS total_amount "
+                    f"FROM customer_rollup{where} GROUP BY customer_name "
+                    f"HAVING SUM(bill_count) > 0 "
+                    f"ORDER BY total_amount DESC LIMIT {int(limit)}"), params
+        return (f"SELECT customer_name, SUM(total_amount) AS total_amount "
+                f"FROM billing_records{self.where} GROUP BY customer_name "
+                f"ORDER BY total_amount DESC LIMIT {int(limit)}"), self.params
+
+    def records_sql(self):
+        return (f"SELECT {', '.join(RECORD_COLUMNS)} FROM billing_records{self.where} "
+                f"ORDER BY date")
+
+
+def _fetch(conn, sql, params):
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def fetch_summary(conn, export):
+    """(record count, monthly rows, top customer rows) of the report, computed by the database"""
+    total = _fetch(conn, export.count_sql(), export.params)[0][0]
+    if not total:
+        return 0, [], []
+    return (total, _fetch(conn, *export.monthly_summary()),
+            _fetch(conn, *export.top_customers()))
+
+
+def write_workbook(conn, filename, export, chunk_size=10000, progress=None, summary=None,
+                   metrics=None):
+    """Write the report with a write-only workbook, streaming All Records in chunks.
+
+    Aggregates are computed by the database (from the rollup tables when the
+    range allows) first, unless a fetch_summary() result is passed in; the
+    record cursor is then read with fetchmany so only chunk_size rows are
+    held at a time. Time spent in the database ('summary', 'fetch') and on
+    the workbook ('write') is recorded as separate stages of metrics.
+    Returns the number of records written, 0 (and no file) if the range is empty.
+    """
+    metrics = metrics or Instrumentation()
+    if summary is None:
+        with metrics.stage('summary'):
+            summary = fetch_summary(conn, export)
+    total, monthly, customers = summary
+    if not total:
+        return 0
+
+    wb = Workbook(write_only=True)
+    records_ws = wb.create_sheet('All Records')
+    monthly_ws = wb.create_sheet('Monthly Summary')
+    customers_ws = wb.create_sheet('Top Customers')
+
+    monthly_ws.append(['date', 'total_amount', 'total_transactions'])
+    for row in monthly:
+        monthly_ws.append(list(row))
+    customers_ws.append(['customer_name', 'total_amount'])
+    for row in customers:
+        customers_ws.append(list(row))
+
+    records_ws.append(list(RECORD_COLUMNS))
+    cursor = conn.cursor()
+    try:
+        with metrics.stage('fetch'):
+            cursor.execute(export.records_sql(), export.params)
+        written = 0
+        while True:
+            with metrics.stage('fetch') as stage:
+                rows = cursor.fetchmany(chunk_size)
+                stage.rows_out += len(rows)
+            if not rows:
+                break
+            with metrics.stage('write', rows_in=len(rows)) as stage:
+                for row in rows:
+                    records_ws.append(list(row))
+                stage.rows_out += len(rows)
+            written += len(rows)
+            if progress:
+                progress.update("Writing All Records", rows_loaded=written, rows_total=total)
+    finally:
+        cursor.close()
+
+    with metrics.stage('write'):
+        wb.save(filename)
+    return written
@@ -0,0 +1,117 @@
+"""Per-stage timing for the ingest and export pipelines.
+
+Each stage (discover, parse, clean, connect, ddl, diff, insert, rollups, commit,
+summary, fetch, write, ...) accumulates wall time, CPU time, rows in/out and the peak RSS seen when
+it finished. A stage entered several times, such as insert once per batch,
+adds up into a single entry.
+"""
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger('billing.metrics')
+
+
+def cpu_seconds():
+    """CPU time of this process plus its finished child processes (parser pool workers)"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process or any child so far, None where unsupported"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+@dataclass
+class StageStats:
+    """Accumulated figures for one pipeline stage"""
+    stage: str
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    peak_rss_mb: float = None
+
+
+class Instrumentation:
+    """Collects StageStats in the order stages first ran"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, rows_in=0):
+        """Time the block as stage name; add to .rows_out on the yielded StageStats"""
+        stats = self.stages.setdefault(name, StageStats(name))
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield stats
+        finally:
+            stats.calls += 1
+            stats.wall_seconds += time.perf_counter() - wall
+            stats.cpu_seconds += cpu_seconds() - cpu
+            stats.rows_in += rows_in
+            stats.peak_rss_mb = peak_rss_mb()
+
+    def iterate(self, name, iterable, rows=len):
+        """Yield from iterable, timing each step as stage name (rows(item) rows out)"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as stats:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                stats.rows_out += rows(item)
+            yield item
+
+    def as_dicts(self):
+        return [{**asdict(s), 'wall_seconds': round(s.wall_seconds, 4),
+                 'cpu_seconds': round(s.cpu_seconds, 4)} for s in self.stages.values()]
+
+    def slowest(self):
+        """The StageStats with the most wall time, or None"""
+        return max(self.stages.values(), key=lambda s: s.wall_seconds, default=None)
+
+    def log(self, run=None):
+        """Emit one structured JSON record per stage on the billing.metrics logger"""
+        for record in self.as_dicts():
+            logger.info(json.dumps({'event': 'stage', 'run': run, **record}))
+
+    def prometheus(self, prefix='billing_pipeline', labels=None):
+        """Stage figures in the Prometheus text exposition format"""
+        extra = ''.join(f',{key}="{value}"' for key, value in (labels or {}).items())
+        metrics = [
+            ('stage_wall_seconds', 'Wall-clock seconds spent in the stage', 'wall_seconds'),
+            ('stage_cpu_seconds', 'CPU seconds spent in the stage', 'cpu_seconds'),
+            ('stage_rows_in', 'Rows entering the stage', 'rows_in'),
+            ('stage_rows_out', 'Rows leaving the stage', 'rows_out'),
+            ('stage_calls', 'Times the stage ran', 'calls'),
+            ('stage_peak_rss_megabytes', 'Peak resident memory after the stage', 'peak_rss_mb'),
+        ]
+        lines = []
+        for name, help_text, field_name in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for stats in self.stages.values():
+                value = getattr(stats, field_name)
+                if value is not None:
+                    lines.append(f'{prefix}_{name}{{stage="{stats.stage}"{extra}}} {value}')
+        return '\n'.join(lines) + '\n'
+
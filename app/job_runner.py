@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when the user pressed Cancel"""
+
+
+@dataclass
+class ProgressEvent:
+    """A progress update sent from a worker thread to the UI"""
+    kind: str  # 'progress', 'done', 'error' or 'cancelled'
+    message: str = ''
+    files_done: int = 0
+    files_total: int = 0
+    rows_loaded: int = 0
+    rows_total: int = 0
+    rows_per_sec: float = 0.0
+    eta_seconds: float = None
+    result: object = None
+
+    @property
+    def fraction(self):
+        """Completed share of the job, from rows when known, otherwise from files"""
+        if self.rows_total:
+            return min(self.rows_loaded / self.rows_total, 1.0)
+        if self.files_total:
+            return min(self.files_done / self.files_total, 1.0)
+        return 0.0
+
+
+class ProgressReporter:
+    """Handed to a job so it can report progress and notice cancellation"""
+
+    def __init__(self, events, cancel_event):
+        self.events = events
+        self.cancel_event = cancel_event
+        self.started = time.perf_counter()
+        self.message = ''
+        self.files_done = 0
+        self.files_total = 0
+        self.rows_loaded = 0
+        self.rows_total = 0
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """Stop the job here if Cancel was pressed"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def update(self, message=None, files_done=None, files_total=None,
+               rows_loaded=None, rows_total=None):
+        """Record new counters and queue a progress event"""
+        if message is not None:
+            self.message = message
+        if files_done is not None:
+            self.files_done = files_done
+        if files_total is not None:
+            self.files_total = files_total
+        if rows_loaded is not None:
+            self.rows_loaded = rows_loaded
+        if rows_total is not None:
+            self.rows_total = rows_total
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows_loaded / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.rows_total and rate > 0:
+            eta = (self.rows_total - self.rows_loaded) / rate
+        elif self.files_total and self.files_done:
+            eta = elapsed / self.files_done * (self.files_total - self.files_done)
+        self.events.put(ProgressEvent('progress', self.message, self.files_done, self.files_total,
+                                      self.rows_loaded, self.rows_total, rate, eta))
+        self.check()
+
+
+class JobRunner:
+    """Run one job at a time on a worker thread, polling its events from the Tk loop"""
+
+    def __init__(self, root, on_progress, on_finished, poll_ms=100):
+        self.root = root
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.poll_ms = poll_ms
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.handlers = {}
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, job, args=(), on_done=None, on_error=None, on_cancelled=None):
+        """Run job(reporter, *args) in the background and dispatch its outcome on the Tk thread"""
+        if self.running:
+            raise RuntimeError("A job is already running")
+        self.cancel_event.clear()
+        self.handlers = {'done': on_done, 'error': on_error, 'cancelled': on_cancelled}
+        reporter = ProgressReporter(self.events, self.cancel_event)
+        self.thread = threading.Thread(target=self._run, args=(job, reporter, args), daemon=True)
+        self.thread.start()
+        self.root.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        """Ask the running job to stop at its next checkpoint"""
+        self.cancel_event.set()
+
+    def _run(self, job, reporter, args):
+        try:
+            result = job(reporter, *args)
+            self.events.put(ProgressEvent('done', result=result))
+        except JobCancelled:
+            self.events.put(ProgressEvent('cancelled', message="Cancelled"))
+        except Exception as e:
+            self.events.put(ProgressEvent('error', message=str(e), result=e))
+
+    def _poll(self):
+        """Drain queued events on the Tk thread and reschedule until the job ends"""
+        latest = None
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event.kind == 'progress':
+                latest = event
+                continue
+            self.on_finished()
+            handler = self.handlers.get(event.kind)
+            if handler and event.kind == 'cancelled':
+                handler()
+            elif handler:
+                handler(event.result)
+            return
+        if latest:
+            self.on_progress(latest)
+        self.root.after(self.poll_ms, self._poll)
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass, field
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Content hash of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class FileEntry:
+    """What was loaded from one workbook on the last successful run"""
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    row_count: int = 0
+    bill_min: str = None
+    bill_max: str = None
+    bill_nos: frozenset = field(default_factory=frozenset)
+
+
+class IngestManifest:
+    """Persisted record of ingested workbooks, used to skip unchanged files.
+
+    The file keeps one set of entries per database, so a workbook loaded
+    into one database is still new to any other.
+    """
+
+    def __init__(self, path='manifest.pkl', database=None):
+        self.path = path
+        self.database = database
+        self.entries = {}
+        self.others = {}  # entries of the other databases, saved back untouched
+
+    @classmethod
+    def load(cls, path='manifest.pkl', database=None):
+        """Load the saved entries for database, or start an empty set"""
+        manifest = cls(path, database)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                saved = pickle.load(f)
+            if any(isinstance(entry, FileEntry) for entry in saved.values()):
+                # Manifest written before entries were kept per database
+                saved = {database: saved}
+            manifest.entries = saved.pop(database, {})
+            manifest.others = saved
+        return manifest
+
+    def save(self):
+        """Save the manifest to its pickle file"""
+        with open(self.path, 'wb') as f:
+            pickle.dump({**self.others, self.database: self.entries}, f)
+
+    def plan(self, files):
+        """Split files into (changed, unchanged) and list manifest entries whose file is gone.
+
+        A file whose size and mtime match its entry is unchanged without being read.
+        Otherwise it is hashed; a matching hash only refreshes the stored stat.
+        """
+        changed, unchanged = [], []
+        for file in files:
+            key = os.path.abspath(file)
+            entry = self.entries.get(key)
+            stat = os.stat(file)
+            if entry and entry.size == stat.st_size and entry.mtime == stat.st_mtime:
+                unchanged.append(file)
+                continue
+            if entry and entry.sha256 == file_sha256(file):
+                entry.size, entry.mtime = stat.st_size, stat.st_mtime
+                unchanged.append(file)
+                continue
+            changed.append(file)
+        current = {os.path.abspath(f) for f in files}
+        removed = [key for key in self.entries if key not in current]
+        return changed, unchanged, removed
+
+    def recorded_elsewhere(self, bills, exclude=()):
+        """The given Bill_No values that are recorded for files other than those in exclude.
+
+        Each entry is intersected with the candidates, so the cost follows the
+        number of candidates rather than the bills of every file ever loaded.
+        """
+        exclude = {os.path.abspath(f) for f in exclude}
+        remaining = set(bills)
+        found = set()
+        for key, entry in self.entries.items():
+            if not remaining:
+                break
+            if key not in exclude:
+                hits = remaining & entry.bill_nos
+                found |= hits
+                remaining -= hits
+        return found
+
+    def deleted_bills(self, file, df):
+        """Bill_No values recorded for file last time that are no longer in df"""
+        entry = self.entries.get(os.path.abspath(file))
+        if not entry:
+            return set()
+        return set(entry.bill_nos) - set(df['Bill_No'].dropna().astype(str))
+
+    def record(self, file, df):
+        """Remember a successfully loaded workbook"""
+        stat = os.stat(file)
+        bills = df['Bill_No'].dropna().astype(str)
+        self.entries[os.path.abspath(file)] = FileEntry(
+            path=os.path.abspath(file),
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            sha256=file_sha256(file),
+            row_count=len(df),
+            bill_min=bills.min() if len(bills) else None,
+            bill_max=bills.max() if len(bills) else None,
+            bill_nos=frozenset(bills),
+        )
+
+    def forget(self, key):
+        """Drop the entry for a workbook that no longer exists"""
+        self.entries.pop(key, None)
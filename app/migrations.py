@@ -0,0 +1,184 @@
+"""Versioned schema migrations for billing_records.
+
+Each migration runs once per database and is recorded in schema_migrations.
+New schema changes are appended to MIGRATIONS with the next version number.
+"""
+from dataclasses import dataclass
+
+from backends import get_backend
+from rollups import ROLLUP_TABLES_SQL, backfill_sql
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS billing_records (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        bill_no VARCHAR(50) UNIQUE,
+        date DATE,
+        customer_name VARCHAR(100),
+        contact_number VARCHAR(20),
+        item_name VARCHAR(100),
+        quantity INT,
+        weight_grams DECIMAL(10, 2),
+        rate_per_gram DECIMAL(10, 2),
+        making_charges DECIMAL(10, 2),
+        total_amount DECIMAL(12, 2),
+        payment_mode VARCHAR(50),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Same table for the SQLite adapter (local testing and offline use)
+SQLITE_CREATE_TABLE_SQL = CREATE_TABLE_SQL.replace(
+    'id INT AUTO_INCREMENT PRIMARY KEY', 'id INTEGER PRIMARY KEY AUTOINCREMENT')
+
+# DuckDB has no AUTO_INCREMENT; ids come from a sequence
+DUCKDB_CREATE_TABLE_SQL = (
+    "CREATE SEQUENCE IF NOT EXISTS billing_records_id_seq",
+    CREATE_TABLE_SQL.replace('id INT AUTO_INCREMENT PRIMARY KEY',
+                             "id INTEGER PRIMARY KEY DEFAULT nextval('billing_records_id_seq')"),
+)
+
+# Single-row counter bumped by every load that changes billing_records
+INGEST_STATE_SQL = (
+    "CREATE TABLE IF NOT EXISTS ingest_state (id INT PRIMARY KEY, generation INT NOT NULL)",
+    "INSERT INTO ingest_state (id, generation) VALUES (1, 0)",
+)
+
+# (name, columns) of the secondary indexes used by exports and summaries
+# (MySQL and SQLite only; DuckDB scans its columns instead)
+INDEXES = [
+    ('idx_billing_date_amount', 'date, total_amount'),
+    ('idx_billing_customer_date', 'customer_name, date, total_amount'),
+    ('idx_billing_payment_date', 'payment_mode, date'),
+]
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    mysql: tuple = ()
+    sqlite: tuple = ()
+    duckdb: tuple = ()
+
+    def statements(self, dialect):
+        return getattr(self, dialect)
+
+
+MIGRATIONS = [
+    Migration(1, 'create billing_records',
+              mysql=(CREATE_TABLE_SQL,),
+              sqlite=(SQLITE_CREATE_TABLE_SQL,),
+              duckdb=DUCKDB_CREATE_TABLE_SQL),
+    Migration(2, 'secondary indexes for date, customer and payment mode',
+              mysql=tuple(f"CREATE INDEX {name} ON billing_records ({cols})"
+                          for name, cols in INDEXES),
+              sqlite=tuple(f"CREATE INDEX IF NOT EXISTS {name} ON billing_records ({cols})"
+                           for name, cols in INDEXES)),
+    Migration(3, 'tighten column types',
+              mysql=("""ALTER TABLE billing_records
+                        MODIFY bill_no VARCHAR(50) NOT NULL,
+                        MODIFY quantity SMALLINT UNSIGNED,
+                        MODIFY created_at DATETIME DEFAULT CURRENT_TIMESTAMP""",)),
+    Migration(4, 'monthly and customer rollup tables',
+              mysql=(*ROLLUP_TABLES_SQL, *backfill_sql('mysql')),
+              sqlite=(*ROLLUP_TABLES_SQL, *backfill_sql('sqlite')),
+              duckdb=(*ROLLUP_TABLES_SQL, *backfill_sql('duckdb'))),
+    Migration(5, 'branch and source file/sheet of each bill',
+              mysql=("""ALTER TABLE billing_records
+                        ADD COLUMN branch VARCHAR(100),
+                        ADD COLUMN source_file VARCHAR(500),
+                        ADD COLUMN source_sheet VARCHAR(100)""",
+                     "CREATE INDEX idx_billing_branch_date ON billing_records (branch, date)"),
+              sqlite=("ALTER TABLE billing_records ADD COLUMN branch VARCHAR(100)",
+                      "ALTER TABLE billing_records ADD COLUMN source_file VARCHAR(500)",
+                      "ALTER TABLE billing_records ADD COLUMN source_sheet VARCHAR(100)",
+                      "CREATE INDEX IF NOT EXISTS idx_billing_branch_date "
+                      "ON billing_records (branch, date)"),
+              duckdb=("ALTER TABLE billing_records ADD COLUMN branch VARCHAR(100)",
+                      "ALTER TABLE billing_records ADD COLUMN source_file VARCHAR(500)",
+                      "ALTER TABLE billing_records ADD COLUMN source_sheet VARCHAR(100)")),
+    Migration(6, 'content hash of each bill',
+              mysql=("ALTER TABLE billing_records ADD COLUMN row_hash CHAR(32)",),
+              sqlite=("ALTER TABLE billing_records ADD COLUMN row_hash CHAR(32)",),
+              duckdb=("ALTER TABLE billing_records ADD COLUMN row_hash CHAR(32)",)),
+    Migration(7, 'ingest generation counter',
+              mysql=INGEST_STATE_SQL, sqlite=INGEST_STATE_SQL, duckdb=INGEST_STATE_SQL),
+    # Migration 3 used to narrow payment_mode to VARCHAR(30), shorter than
+    # monthly_rollup.payment_mode; widen it again where that was applied
+    Migration(8, 'payment_mode back to VARCHAR(50)',
+              mysql=("ALTER TABLE billing_records MODIFY payment_mode VARCHAR(50)",)),
+]
+
+MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(200),
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def current_version(conn):
+    """Highest applied migration version (0 for a fresh database)"""
+    cursor = conn.cursor()
+    cursor.execute(MIGRATIONS_TABLE_SQL)
+    cursor.execute("SELECT MAX(version) FROM schema_migrations")
+    version = cursor.fetchone()[0] or 0
+    cursor.close()
+    return version
+
+
+def migrate(conn, dialect='mysql', target=None):
+    """Apply pending migrations up to target (default: latest); returns the versions applied"""
+    applied = []
+    version = current_version(conn)
+    placeholder = get_backend(dialect).placeholder
+    cursor = conn.cursor()
+    for migration in MIGRATIONS:
+        if migration.version <= version or (target and migration.version > target):
+            continue
+        for statement in migration.statements(dialect):
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO schema_migrations (version, name) "
+                       f"VALUES ({placeholder}, {placeholder})",
+                       (migration.version, migration.name))
+        conn.commit()
+        applied.append(migration.version)
+    cursor.close()
+    return applied
+
+
+def partition_by_year(conn, first_year, last_year):
+    """Re-partition billing_records by RANGE on YEAR(date) (MySQL only, opt-in).
+
+    MySQL requires the partitioning column in every unique key, so the primary
+    key becomes (id, date) and the Bill_No key becomes (bill_no, date). A bill
+    whose date is later corrected is then stored as a new row; only enable this
+    for histories where bill dates are final.
+    """
+    partitions = ", ".join(f"PARTITION p{year} VALUES LESS THAN ({year + 1})"
+                           for year in range(first_year, last_year + 1))
+    cursor = conn.cursor()
+    cursor.execute("""ALTER TABLE billing_records
+                      MODIFY date DATE NOT NULL,
+                      DROP PRIMARY KEY, ADD PRIMARY KEY (id, date),
+                      DROP INDEX bill_no, ADD UNIQUE KEY uq_bill_no_date (bill_no, date)""")
+    cursor.execute(f"ALTER TABLE billing_records PARTITION BY RANGE (YEAR(date)) "
+                   f"({partitions}, PARTITION pmax VALUES LESS THAN MAXVALUE)")
+    conn.commit()
+    cursor.close()
+
+
+def explain_indexes(conn, dialect, queries):
+    """EXPLAIN each (label, sql, params) query and report which index it uses.
+
+    Returns a list of dicts with label, index (None for a full scan) and the raw plan.
+    """
+    backend = get_backend(dialect)
+    report = []
+    cursor = conn.cursor()
+    for label, sql, params in queries:
+        index, plan = backend.explain(cursor, sql, params)
+        report.append({'query': label, 'index': index, 'plan': plan})
+    cursor.close()
+    return report
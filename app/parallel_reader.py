@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+
+def default_workers():
+    """Number of parser processes to use when none is configured"""
+    return os.cpu_count() or 1
+
+
+def parser_pool(workers):
+    """Process pool for parsing workbooks.
+
+    Workers are spawned rather than forked: the pool is created from worker
+    threads (the GUI job runner, the pipeline producer), and forking a
+    process that runs other threads (or holds a Tk connection) can deadlock.
+    """
+    return ProcessPoolExecutor(max_workers=workers,
+                               mp_context=multiprocessing.get_context('spawn'))
+
+
+def read_workbook(file):
+    """Parse every billing sheet of one workbook into one DataFrame (runs in a worker process).
+
+    Sheets without a Bill_No column (notes, pivot sheets) are skipped; rows are
+    tagged with the name of the sheet they came from in Source_Sheet.
+    """
+    sheets = pd.read_excel(file, sheet_name=None, engine='openpyxl')
+    frames = [df.assign(Source_Sheet=name) for name, df in sheets.items() if 'Bill_No' in df]
+    if not frames:
+        return pd.DataFrame(columns=['Bill_No', 'Source_Sheet'])
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def read_workbooks(files, workers=None, on_file=None):
+    """Parse workbooks across a process pool, returning frames in the same order as files.
+
+    With workers=1 (or a single file) everything is parsed in-process, which
+    avoids the pool start-up cost for small folders. on_file(file, df) is
+    called as each frame arrives; if it raises, pending parses are cancelled.
+    """
+    files = list(files)
+    workers = min(workers or default_workers(), len(files)) if files else 1
+    frames = []
+    if workers <= 1:
+        for file in files:
+            frames.append(read_workbook(file))
+            if on_file:
+                on_file(file, frames[-1])
+        return frames
+    chunksize = max(1, len(files) // (workers * 4))
+    executor = parser_pool(workers)
+    try:
+        for file, df in zip(files, executor.map(read_workbook, files, chunksize=chunksize)):
+            frames.append(df)
+            if on_file:
+                on_file(file, df)
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return frames
+
+
+def iter_workbooks(files, workers=None, prefetch=2):
+    """Yield (file, df) in input order, parsing ahead across a process pool.
+
+    At most workers + prefetch workbooks are parsed ahead of the consumer, so
+    a slow consumer holds back the parsers instead of piling up frames.
+    """
+    files = list(files)
+    workers = min(workers or default_workers(), len(files)) if files else 1
+    if workers <= 1:
+        for file in files:
+            yield file, read_workbook(file)
+        return
+    executor = parser_pool(workers)
+    remaining = iter(files)
+    try:
+        pending = deque((file, executor.submit(read_workbook, file))
+                        for file in islice(remaining, workers + prefetch))
+        while pending:
+            file, future = pending.popleft()
+            df = future.result()
+            pending.extend((nxt, executor.submit(read_workbook, nxt))
+                           for nxt in islice(remaining, 1))
+            yield file, df
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
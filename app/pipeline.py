@@ -0,0 +1,73 @@
+"""Producer/consumer hand-off between parsing and loading.
+
+pipelined() runs a generator on a background thread and passes its items
+through a bounded queue, so the calling thread (which owns the database
+connection) loads file N while file N+1 is being parsed and cleaned. When
+the queue is full the producer waits: a slow database holds back parsing
+instead of letting parsed frames pile up in memory.
+"""
+import queue
+import threading
+
+from instrumentation import Instrumentation
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries a producer exception across the queue"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def pipelined(items, maxsize=4, metrics=None):
+    """Iterate items (produced on a worker thread) through a queue of at most maxsize items.
+
+    Exceptions raised by the producer are re-raised here. If the consumer stops
+    early (an error, or a cancelled job) the producer is stopped and joined.
+    Time the consumer spends waiting is recorded as 'queue_wait' and time the
+    producer spends blocked on a full queue as 'backpressure'.
+    """
+    metrics = metrics or Instrumentation()
+    handoff = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                with metrics.stage('backpressure'):
+                    if not put(item):
+                        return
+        except BaseException as e:
+            put(_Failure(e))
+            return
+        finally:
+            close = getattr(items, 'close', None)
+            if close:
+                close()
+        put(_DONE)
+
+    producer = threading.Thread(target=produce, name='ingest-producer', daemon=True)
+    producer.start()
+    try:
+        while True:
+            with metrics.stage('queue_wait'):
+                item = handoff.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
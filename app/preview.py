@@ -0,0 +1,160 @@
+"""Cheap workbook previews backed by a persisted header/sample index.
+
+Only the header, the first few rows and the sheet dimension of a workbook are
+read (openpyxl read_only mode), and the result is cached per file. Like the
+ingest manifest, a cached entry is reused while the file's size and mtime
+match, and a changed stat with an unchanged hash only refreshes the stat.
+Workbooks already in the staging cache are sampled from their cached frame.
+"""
+import os
+import pickle
+from dataclasses import dataclass, field
+from itertools import islice
+
+from openpyxl import load_workbook
+
+from manifest import file_sha256
+
+# Bumped whenever read_sample changes what it samples, discarding saved entries
+INDEX_VERSION = 2
+
+
+@dataclass
+class PreviewEntry:
+    """Header, approximate row count and leading rows of one workbook"""
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    columns: list = field(default_factory=list)
+    row_count: int = 0
+    sample: list = field(default_factory=list)
+
+
+def read_sample(file, nrows=10):
+    """(columns, row_count, sample) from the first billing sheet without parsing the whole file.
+
+    As in ingest, the billing sheet is the first one whose header has a
+    Bill_No column; a workbook without one previews as empty. The row count
+    comes from the sheet's stored dimension; only files written without one
+    are scanned to the end.
+    """
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, ())
+            if 'Bill_No' in [str(h).strip() for h in header if h is not None]:
+                break
+        else:
+            return [], 0, []
+        sample = [row for row in islice(rows, nrows) if any(v is not None for v in row)]
+        if ws.max_row:
+            row_count = max(ws.max_row - 1, len(sample))
+        else:
+            row_count = len(sample) + sum(1 for row in rows if any(v is not None for v in row))
+    finally:
+        wb.close()
+    columns = [str(c) if c is not None else f"Column{i + 1}" for i, c in enumerate(header)]
+    return columns, row_count, sample
+
+
+class PreviewIndex:
+    """Persisted PreviewEntry per workbook, keyed by absolute path"""
+
+    def __init__(self, path='preview_index.pkl', nrows=10, staging=None):
+        self.path = path
+        self.nrows = nrows
+        self.staging = staging
+        self.entries = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path='preview_index.pkl', nrows=10, staging=None):
+        """Load a saved index, or start an empty one"""
+        index = cls(path, nrows, staging)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                saved = pickle.load(f)
+            if isinstance(saved, tuple) and saved[0] == INDEX_VERSION:
+                index.entries = saved[1]
+        return index
+
+    def save(self):
+        """Save the index to its pickle file if anything changed"""
+        if self.dirty:
+            with open(self.path, 'wb') as f:
+                pickle.dump((INDEX_VERSION, self.entries), f)
+            self.dirty = False
+
+    def get(self, file):
+        """Cached entry for file, (re)reading the workbook only if its content changed"""
+        key = os.path.abspath(file)
+        entry = self.entries.get(key)
+        stat = os.stat(file)
+        if (entry and entry.size == stat.st_size and entry.mtime == stat.st_mtime
+                and len(entry.sample) >= min(self.nrows, entry.row_count)):
+            return entry
+        sha256 = file_sha256(file)
+        if (entry and entry.sha256 == sha256
+                and len(entry.sample) >= min(self.nrows, entry.row_count)):
+            entry.size, entry.mtime = stat.st_size, stat.st_mtime
+        else:
+            df = self.staging.get(file) if self.staging else None
+            if df is not None:
+                head = df.head(self.nrows).astype(object)
+                columns, row_count = [str(c) for c in df.columns], len(df)
+                sample = [tuple(row) for row in head.where(head.notna(), None).itertuples(index=False)]
+            else:
+                columns, row_count, sample = read_sample(file, self.nrows)
+            entry = PreviewEntry(key, stat.st_size, stat.st_mtime, sha256,
+                                 columns, row_count, sample)
+        self.entries[key] = entry
+        self.dirty = True
+        return entry
+
+    def prune(self, files):
+        """Drop entries for workbooks that are not in files"""
+        current = {os.path.abspath(f) for f in files}
+        for key in [k for k in self.entries if k not in current]:
+            del self.entries[key]
+            self.dirty = True
+
+
+class PreviewPager:
+    """Walks the sample rows of many workbooks a page at a time.
+
+    Workbooks are only opened (or looked up in the index) when a page reaches
+    them, so the first page costs the same for a folder of three files as for
+    one of three hundred.
+    """
+
+    def __init__(self, files, index, page_size=50, root=None):
+        self.files = list(files)
+        self.index = index
+        self.root = root
+        self.page_size = page_size
+        self.position = 0
+        self.columns = []
+        self.rows_seen = 0
+
+    @property
+    def exhausted(self):
+        return self.position >= len(self.files)
+
+    def next_page(self):
+        """Up to about page_size rows as (file name, {column: value}) pairs"""
+        page = []
+        while not self.exhausted and len(page) < self.page_size:
+            file = self.files[self.position]
+            self.position += 1
+            entry = self.index.get(file)
+            self.rows_seen += entry.row_count
+            for column in entry.columns:
+                if column not in self.columns:
+                    self.columns.append(column)
+            name = (os.path.relpath(file, self.root).replace(os.sep, '/') if self.root
+                    else os.path.basename(file))
+            page.extend((name, dict(zip(entry.columns, row))) for row in entry.sample)
+        self.index.save()
+        return page
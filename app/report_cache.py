@@ -0,0 +1,164 @@
+"""Cache of generated yearly reports.
+
+A report is keyed by its query parameters (database, year and date range)
+and stamped with the ingest generation it was built from: every batch the
+loader writes or deletes bumps the generation in the database, so a report
+is reused exactly as long as nothing has been ingested since. Entries also
+expire after ttl seconds.
+
+Each entry keeps the summary rows (count, monthly totals, top customers)
+in the index and the finished workbook as a file. Once the files outgrow
+max_bytes the least recently used ones are deleted; their summaries stay,
+so the next export of that report skips the aggregations and only streams
+the records again.
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+
+# Bumped whenever write_workbook changes what a report contains
+REPORT_VERSION = 1
+
+
+@dataclass
+class ReportEntry:
+    """One cached report: its summary rows and, while it fits, the workbook file"""
+    generation: int
+    created: float
+    records: int
+    monthly: list
+    customers: list
+    path: str = None
+    size: int = 0
+    used: float = 0.0
+
+
+class ReportCache:
+    """Reports by query parameters and ingest generation, with TTL and size-bounded eviction"""
+
+    def __init__(self, cache_dir='report_cache', ttl=3600, max_bytes=256 << 20):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.summary_hits = 0
+        self.misses = 0
+        self.index_path = os.path.join(cache_dir, 'index.pkl')
+        self.entries = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                self.entries = pickle.load(f)
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.index_path, 'wb') as f:
+            pickle.dump(self.entries, f)
+
+    def _file(self, key):
+        digest = hashlib.sha256(repr((REPORT_VERSION, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.xlsx")
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        if entry.path and os.path.exists(entry.path):
+            os.remove(entry.path)
+
+    def lookup(self, key, generation):
+        """The entry for key if it was built at generation and has not expired, else None.
+
+        A returned entry without a path has lost its file to eviction: only
+        its summary rows can be reused.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and (entry.generation != generation
+                          or time.time() - entry.created > self.ttl):
+                self._drop(key)
+                self._save_index()
+                entry = None
+            if entry and entry.path and not os.path.exists(entry.path):
+                entry.path, entry.size = None, 0
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.path:
+                self.hits += 1
+            else:
+                self.summary_hits += 1
+            entry.used = time.time()
+            return entry
+
+    def store(self, key, generation, records, monthly, customers, file=None):
+        """Remember a report built at generation, copying its workbook file into the cache"""
+        with self.lock:
+            now = time.time()
+            entry = ReportEntry(generation, now, records, list(monthly), list(customers),
+                                used=now)
+            if file:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                entry.path = self._file(key)
+                tmp = f"{entry.path}.{os.getpid()}.tmp"
+                shutil.copyfile(file, tmp)
+                os.replace(tmp, entry.path)
+                entry.size = os.path.getsize(entry.path)
+            if key in self.entries and self.entries[key].path != entry.path:
+                self._drop(key)
+            self.entries[key] = entry
+            self._evict()
+            self._save_index()
+            return entry
+
+    def _evict(self):
+        """Drop expired entries, then delete LRU files until they fit in max_bytes"""
+        now = time.time()
+        for key in [k for k, e in self.entries.items() if now - e.created > self.ttl]:
+            self._drop(key)
+        total = sum(entry.size for entry in self.entries.values())
+        for entry in sorted(self.entries.values(), key=lambda e: e.used):
+            if total <= self.max_bytes:
+                break
+            if entry.path:
+                if os.path.exists(entry.path):
+                    os.remove(entry.path)
+                total -= entry.size
+                entry.path, entry.size = None, 0
+
+    def clear(self):
+        """Drop every cached report; returns the number of entries removed"""
+        with self.lock:
+            count = len(self.entries)
+            for key in list(self.entries):
+                self._drop(key)
+            self._save_index()
+            return count
+
+    def stats(self):
+        with self.lock:
+            return {
+                'reports': len(self.entries),
+                'files': sum(1 for entry in self.entries.values() if entry.path),
+                'bytes': sum(entry.size for entry in self.entries.values()),
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'summary_hits': self.summary_hits,
+                'misses': self.misses,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_report_cache(cache_dir='report_cache', ttl=3600, max_bytes=256 << 20):
+    """Shared ReportCache for a directory, created on first use, so hit counts accumulate"""
+    key = (os.path.abspath(cache_dir), ttl, max_bytes)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ReportCache(cache_dir, ttl, max_bytes)
+        return _caches[key]
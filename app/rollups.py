@@ -0,0 +1,161 @@
+"""Rollup tables kept in step with billing_records at ingest time.
+
+monthly_rollup holds totals per year x month x payment_mode and
+customer_rollup per customer x year. The loader snapshots the affected bills
+before and after each batch and applies the difference, so upserts,
+corrections and deletes all keep the rollups exact without rescanning.
+"""
+from collections import defaultdict
+
+from backends import get_backend
+
+ROLLUP_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS monthly_rollup (
+        year INT NOT NULL,
+        month INT NOT NULL,
+        payment_mode VARCHAR(50) NOT NULL,
+        total_amount DECIMAL(16, 2) NOT NULL DEFAULT 0,
+        weight_grams DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        bill_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (year, month, payment_mode)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS customer_rollup (
+        customer_name VARCHAR(100) NOT NULL,
+        year INT NOT NULL,
+        total_amount DECIMAL(16, 2) NOT NULL DEFAULT 0,
+        weight_grams DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        bill_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (customer_name, year)
+    )
+    """,
+]
+
+
+def recompute_sql(dialect):
+    """Full-scan queries producing the expected contents of both rollup tables"""
+    backend = get_backend(dialect)
+    year, month = backend.year_expr(), backend.month_expr()
+    monthly = (f"SELECT {year}, {month}, COALESCE(payment_mode, ''), "
+               f"COALESCE(SUM(total_amount), 0), COALESCE(SUM(weight_grams), 0), COUNT(*) "
+               f"FROM billing_records WHERE date IS NOT NULL "
+               f"GROUP BY {year}, {month}, COALESCE(payment_mode, '')")
+    customer = (f"SELECT COALESCE(customer_name, ''), {year}, "
+                f"COALESCE(SUM(total_amount), 0), COALESCE(SUM(weight_grams), 0), COUNT(*) "
+                f"FROM billing_records WHERE date IS NOT NULL "
+                f"GROUP BY COALESCE(customer_name, ''), {year}")
+    return monthly, customer
+
+
+def backfill_sql(dialect):
+    """Statements that fill empty rollup tables from billing_records"""
+    monthly, customer = recompute_sql(dialect)
+    return [
+        "INSERT INTO monthly_rollup (year, month, payment_mode, total_amount, weight_grams, "
+        "bill_count) " + monthly,
+        "INSERT INTO customer_rollup (customer_name, year, total_amount, weight_grams, "
+        "bill_count) " + customer,
+    ]
+
+
+def _split_date(value):
+    """(year, month) from a DATE value or an ISO date string"""
+    if isinstance(value, str):
+        return int(value[:4]), int(value[5:7])
+    return value.year, value.month
+
+
+class RollupMaintainer:
+    """Applies before/after deltas of a set of bills to the rollup tables"""
+
+    def __init__(self, dialect='mysql'):
+        self.dialect = dialect
+        self.backend = get_backend(dialect)
+        self.placeholder = self.backend.placeholder
+
+    def snapshot(self, cursor, bill_nos):
+        """Current (date, customer, payment mode, amount, weight) of the given bills"""
+        rows = []
+        bill_nos = list(bill_nos)
+        for start in range(0, len(bill_nos), 1000):
+            chunk = bill_nos[start:start + 1000]
+            cursor.execute(
+                f"SELECT date, customer_name, payment_mode, total_amount, weight_grams "
+                f"FROM billing_records WHERE bill_no IN "
+                f"({', '.join([self.placeholder] * len(chunk))})", chunk)
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def _deltas(self, before, after):
+        monthly = defaultdict(lambda: [0, 0, 0])
+        customers = defaultdict(lambda: [0, 0, 0])
+        for rows, sign in ((before, -1), (after, 1)):
+            for date, customer, payment, amount, weight in rows:
+                if date is None:
+                    continue
+                year, month = _split_date(date)
+                for totals in (monthly[(year, month, payment or '')],
+                               customers[(customer or '', year)]):
+                    totals[0] += sign * (amount or 0)
+                    totals[1] += sign * (weight or 0)
+                    totals[2] += sign
+        return monthly, customers
+
+    def _upsert_sql(self, table, keys):
+        columns = keys + ['total_amount', 'weight_grams', 'bill_count']
+        values = ', '.join([self.placeholder] * len(columns))
+        conflict = self.backend.upsert_clause(keys, columns[len(keys):], accumulate=True)
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({values}) {conflict}"
+
+    def apply(self, cursor, before, after):
+        """Add the difference between two snapshots to the rollup tables"""
+        monthly, customers = self._deltas(before, after)
+        for table, keys, deltas in (
+                ('monthly_rollup', ['year', 'month', 'payment_mode'], monthly),
+                ('customer_rollup', ['customer_name', 'year'], customers)):
+            params = [key + tuple(totals) for key, totals in deltas.items() if any(totals)]
+            if params:
+                cursor.executemany(self._upsert_sql(table, keys), params)
+
+
+def check_rollups(conn, dialect='mysql', tolerance=0.01):
+    """Compare both rollup tables with a full recompute; returns a list of mismatches"""
+    monthly_sql, customer_sql = recompute_sql(dialect)
+    checks = [
+        ('monthly_rollup', 3, monthly_sql,
+         "SELECT year, month, payment_mode, total_amount, weight_grams, bill_count "
+         "FROM monthly_rollup"),
+        ('customer_rollup', 2, customer_sql,
+         "SELECT customer_name, year, total_amount, weight_grams, bill_count "
+         "FROM customer_rollup"),
+    ]
+    mismatches = []
+    cursor = conn.cursor()
+    for table, key_len, expected_sql, actual_sql in checks:
+        cursor.execute(expected_sql)
+        expected = {tuple(row[:key_len]): row[key_len:] for row in cursor.fetchall()}
+        cursor.execute(actual_sql)
+        actual = {tuple(row[:key_len]): row[key_len:] for row in cursor.fetchall()
+                  if row[-1] != 0}
+        for key in expected.keys() | actual.keys():
+            want = expected.get(key, (0, 0, 0))
+            got = actual.get(key, (0, 0, 0))
+            if any(abs(float(w) - float(g)) > tolerance for w, g in zip(want, got)):
+                mismatches.append({'table': table, 'key': list(key),
+                                   'expected': [float(v) for v in want],
+                                   'actual': [float(v) for v in got]})
+    cursor.close()
+    return mismatches
+
+
+def rebuild_rollups(conn, dialect='mysql'):
+    """Discard both rollup tables' contents and recompute them from billing_records"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM monthly_rollup")
+    cursor.execute("DELETE FROM customer_rollup")
+    for statement in backfill_sql(dialect):
+        cursor.execute(statement)
+    conn.commit()
+    cursor.close()
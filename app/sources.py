@@ -0,0 +1,82 @@
+"""Discovery of billing workbooks in nested branch/year folders.
+
+Branches drop their workbooks into per-branch (and usually per-year)
+directories, e.g. Surat/2024/March_2024.xlsx. discover() walks the tree
+with include/exclude glob patterns, listing and stat-ing directories on a
+thread pool, and tags every workbook with the branch taken from its first
+directory below the root.
+"""
+import fnmatch
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+DEFAULT_INCLUDE = ('*.xlsx',)
+DEFAULT_EXCLUDE = ('~$*',)  # Excel lock files
+
+
+@dataclass
+class SourceFile:
+    """One workbook found below the source root"""
+    path: str
+    rel_path: str
+    branch: str
+    size: int
+    mtime: float
+
+
+def _compile(patterns):
+    """One regex matching any of the fnmatch patterns, or None for no patterns"""
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(p) for p in patterns))
+
+
+def _matches(regex, rel_path, name):
+    """True if the pattern regex matches the relative path or just the file name"""
+    return regex is not None and bool(regex.match(rel_path) or regex.match(name))
+
+
+def _scan(directory, rel_dir, include, exclude, recursive):
+    """(subdirectories as (path, rel_path), matching SourceFiles) of one directory"""
+    subdirs, files = [], []
+    branch = rel_dir.split('/', 1)[0] if rel_dir else None
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if entry.is_dir(follow_symlinks=False):
+                if recursive and not _matches(exclude, rel_path, name):
+                    subdirs.append((entry.path, rel_path))
+            elif (_matches(include, rel_path, name) and not _matches(exclude, rel_path, name)
+                  and entry.is_file()):
+                stat = entry.stat()
+                files.append(SourceFile(entry.path, rel_path, branch,
+                                        stat.st_size, stat.st_mtime))
+    return subdirs, files
+
+
+def discover(root, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE, recursive=True,
+             workers=16):
+    """All workbooks below root matching include and not exclude, sorted by relative path.
+
+    Patterns are fnmatch globs tested against both the path relative to root
+    (with '/' separators) and the bare file name; an excluded directory is not
+    descended into. Directories are scanned breadth-first, a whole level at a
+    time across the thread pool.
+    """
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Folder not found: {root}")
+    include, exclude = _compile(include or DEFAULT_INCLUDE), _compile(exclude)
+    found = []
+    level = [(root, '')]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while level:
+            results = executor.map(
+                lambda item: _scan(*item, include, exclude, recursive), level)
+            level = []
+            for subdirs, files in results:
+                level.extend(subdirs)
+                found.extend(files)
+    return sorted(found, key=lambda source: source.rel_path)
@@ -0,0 +1,217 @@
+"""Columnar staging cache of parsed workbooks.
+
+Each parsed workbook is stored once as an Arrow IPC (or Parquet) file named
+after the workbook's SHA-256, so a renamed or copied month is still a hit and
+an edited one is a miss. Arrow files are memory-mapped on read. Cache files
+are touched on every hit and the least recently used ones are evicted once
+the directory grows past max_bytes.
+
+Needs pyarrow; without it the cache is disabled and workbooks are parsed
+from Excel every time.
+"""
+import os
+import pickle
+
+from manifest import file_sha256
+from parallel_reader import iter_workbooks, read_workbooks
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+CACHE_FORMATS = ('arrow', 'parquet')
+
+# Bumped whenever read_workbook changes what a parsed frame contains
+CACHE_VERSION = 2
+
+
+class StagingCache:
+    """Parsed workbooks stored by content hash, with size-bounded LRU eviction"""
+
+    def __init__(self, cache_dir='staging_cache', max_bytes=1 << 30, fmt='arrow'):
+        if fmt not in CACHE_FORMATS:
+            raise ValueError(f"Unknown staging cache format: {fmt}")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+        self.enabled = pa is not None
+        self.hits = 0
+        self.misses = 0
+        # absolute workbook path -> (size, mtime, sha256), so hits skip hashing
+        self.index_path = os.path.join(cache_dir, 'index.pkl')
+        self.index = {}
+        if self.enabled and os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                self.index = pickle.load(f)
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.index_path, 'wb') as f:
+            pickle.dump(self.index, f)
+
+    def _digest(self, file):
+        """Content hash of file, reused from the index while size and mtime match"""
+        key = os.path.abspath(file)
+        stat = os.stat(file)
+        entry = self.index.get(key)
+        if entry and entry[:2] == (stat.st_size, stat.st_mtime):
+            return entry[2]
+        sha256 = file_sha256(file)
+        self.index[key] = (stat.st_size, stat.st_mtime, sha256)
+        return sha256
+
+    def _path(self, sha256):
+        return os.path.join(self.cache_dir, f"{sha256}.v{CACHE_VERSION}.{self.fmt}")
+
+    def _read(self, path):
+        if self.fmt == 'arrow':
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+        else:
+            table = pq.read_table(path, memory_map=True)
+        return table.to_pandas()
+
+    def _write(self, path, df):
+        """Store df atomically; frames Arrow cannot represent are simply not cached"""
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        if self.fmt == 'arrow':
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, tmp)
+        os.replace(tmp, path)
+        return True
+
+    def get(self, file):
+        """Cached frame for file, or None if it has not been staged (never parses)"""
+        if not self.enabled:
+            return None
+        path = self._path(self._digest(file))
+        if not os.path.exists(path):
+            return None
+        df = self._read(path)
+        os.utime(path)
+        return df
+
+    def read(self, file):
+        """Frame for one workbook, parsing and staging it on a miss"""
+        return self.read_many([file], workers=1)[0]
+
+    def read_many(self, files, workers=None, on_file=None):
+        """Frames for files in order; only cache misses are parsed, across a process pool"""
+        files = list(files)
+        if not self.enabled:
+            return read_workbooks(files, workers=workers, on_file=on_file)
+        frames = {}
+        for file in files:
+            df = self.get(file)
+            if df is not None:
+                frames[file] = df
+                self.hits += 1
+                if on_file:
+                    on_file(file, df)
+        misses = [file for file in files if file not in frames]
+        self.misses += len(misses)
+
+        def stage(file, df):
+            frames[file] = df
+            self._write(self._path(self._digest(file)), df)
+            if on_file:
+                on_file(file, df)
+
+        try:
+            if misses:
+                read_workbooks(misses, workers=workers, on_file=stage)
+        finally:
+            self._save_index()
+            self.evict()
+        return [frames[file] for file in files]
+
+    def iter_many(self, files, workers=None, prefetch=2):
+        """Yield (file, df) in order, parsing ahead only the cache misses (see iter_workbooks)"""
+        files = list(files)
+        if not self.enabled:
+            yield from iter_workbooks(files, workers, prefetch)
+            return
+        cached = {}
+        for file in files:
+            path = self._path(self._digest(file))
+            if os.path.exists(path):
+                cached[file] = path
+        misses = iter_workbooks([f for f in files if f not in cached], workers, prefetch)
+        try:
+            for file in files:
+                if file in cached:
+                    self.hits += 1
+                    df = self._read(cached[file])
+                    os.utime(cached[file])
+                else:
+                    self.misses += 1
+                    _, df = next(misses)
+                    self._write(self._path(self._digest(file)), df)
+                yield file, df
+        finally:
+            misses.close()
+            self._save_index()
+            self.evict()
+
+    def _cache_files(self):
+        """(mtime, size, path) of every staged frame"""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(CACHE_FORMATS):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Delete least recently used frames until the cache fits in max_bytes"""
+        entries = sorted(self._cache_files())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def invalidate(self, files=None):
+        """Drop the staged frames of files (all of them when files is None); returns the count"""
+        if files is None:
+            entries = self._cache_files()
+            for _, _, path in entries:
+                os.remove(path)
+            self.index = {}
+            self._save_index()
+            return len(entries)
+        removed = 0
+        for file in files:
+            entry = self.index.pop(os.path.abspath(file), None)
+            sha256 = entry[2] if entry else (file_sha256(file) if os.path.exists(file) else None)
+            if sha256 and os.path.exists(self._path(sha256)):
+                os.remove(self._path(sha256))
+                removed += 1
+        self._save_index()
+        return removed
+
+    def stats(self):
+        entries = self._cache_files()
+        return {
+            'enabled': self.enabled,
+            'format': self.fmt,
+            'files': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
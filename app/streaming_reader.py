@@ -0,0 +1,69 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+from bulk_loader import COLUMNS
+
+
+def _typed_chunk(header, rows):
+    """Build a DataFrame from raw sheet rows, coercing the known billing columns"""
+    df = pd.DataFrame(rows, columns=header)
+    for excel_col, _, kind in COLUMNS:
+        if excel_col not in df:
+            continue
+        if kind == 'date':
+            df[excel_col] = pd.to_datetime(df[excel_col], errors='coerce')
+        elif kind == 'int':
+            df[excel_col] = pd.to_numeric(df[excel_col], errors='coerce').astype('Int64')
+        elif kind == 'decimal':
+            df[excel_col] = pd.to_numeric(df[excel_col], errors='coerce')
+    return df
+
+
+class StreamingReader:
+    """Read workbooks row by row in fixed-size chunks.
+
+    Rows are passed on as read; repeated and missing Bill_Nos are left to
+    validate() (with a shared seen set across chunks), so streaming rejects
+    the same rows as the other ingest modes.
+    """
+
+    def __init__(self, chunk_size=5000):
+        self.chunk_size = chunk_size
+        self.rows_read = 0
+
+    def iter_sheet(self, ws):
+        """Yield typed DataFrame chunks of at most chunk_size rows from one sheet"""
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else f"Column_{i}" for i, h in enumerate(header)]
+        if 'Bill_No' not in header:
+            return
+        width = len(header)
+        buffer = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            self.rows_read += 1
+            buffer.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(buffer) >= self.chunk_size:
+                yield _typed_chunk(header, buffer).assign(Source_Sheet=ws.title)
+                buffer = []
+        if buffer:
+            yield _typed_chunk(header, buffer).assign(Source_Sheet=ws.title)
+
+    def iter_file(self, file):
+        """Yield chunks from every sheet of file that has a Bill_No column"""
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                yield from self.iter_sheet(ws)
+        finally:
+            wb.close()
+
+    def iter_chunks(self, files):
+        """Yield (file, chunk) pairs across all files in order"""
+        for file in files:
+            for chunk in self.iter_file(file):
+                yield file, chunk
@@ -0,0 +1,144 @@
+"""Vectorized validation and cleaning of billing frames.
+
+Every check runs over whole columns at once; rows failing any check are
+split off with a ';'-joined list of reason codes:
+
+    missing_bill_no, bad_date, bad_quantity, bad_weight, bad_rate,
+    bad_making_charges, bad_total, total_mismatch, bad_contact, duplicate_bill_no
+"""
+import hashlib
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ['Quantity', 'Weight_Grams', 'Rate_Per_Gram', 'Making_Charges', 'Total_Amount']
+TEXT_COLUMNS = ['Bill_No', 'Customer_Name', 'Item_Name', 'Payment_Mode']
+
+DEFAULT_LIMITS = {
+    'max_quantity': 1000,
+    'max_weight': 10000.0,     # grams
+    'max_rate': 100000.0,      # per gram
+    'total_tolerance': 1.0,    # absolute, in currency units
+    'total_rel_tolerance': 0.001,
+}
+
+
+def _contact_text(series):
+    """Phone numbers as strings; numbers read as floats (a column with blanks) lose their '.0'"""
+    if pd.api.types.is_numeric_dtype(series):
+        numbers = pd.to_numeric(series, errors='coerce').astype('float64')
+        whole = numbers.notna() & (numbers == np.floor(numbers))
+        text = pd.Series(pd.NA, index=series.index, dtype='string')
+        text[whole] = numbers[whole].astype('int64').astype('string')
+        return text
+    return series.astype('string').str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+
+
+def normalize_contact(series):
+    """Reduce phone numbers to '+91 XXXXXXXXXX'; anything unrecognisable becomes missing"""
+    digits = _contact_text(series).str.replace(r'\D', '', regex=True)
+    local = digits.str.extract(r'^(?:91|0)?(\d{10})$', expand=False)
+    return '+91 ' + local
+
+
+def bill_key(bill_no):
+    """64-bit digest of a Bill_No, for tracking the bills seen across files in little memory"""
+    digest = hashlib.blake2b(str(bill_no).strip().encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _clean_text(series):
+    """Strip text once per distinct value; blank strings become missing"""
+    codes, uniques = pd.factorize(series.astype('string'))
+    stripped = pd.Series(uniques, dtype='string').str.strip()
+    stripped = stripped.mask(stripped.eq('')).to_numpy()
+    values = np.where(codes >= 0, stripped[np.maximum(codes, 0)], pd.NA)
+    return pd.Series(values, index=series.index, dtype='string')
+
+
+def validate(df, limits=None, seen=None):
+    """Coerce types and check every row; returns (clean, rejects).
+
+    rejects carries the original columns plus 'Reject_Reason'. Exact duplicate
+    rows are dropped silently; for a Bill_No repeated with different contents
+    the first occurrence wins and later ones are rejected. When frames are
+    validated one at a time, pass the same seen set (of bill_key digests) to
+    every call so a Bill_No from an earlier frame is rejected the same way.
+    """
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    df = df.drop_duplicates().reset_index(drop=True)
+    out = pd.DataFrame(index=df.index)
+
+    for col in TEXT_COLUMNS:
+        out[col] = (_clean_text(df[col]) if col in df
+                    else pd.Series(pd.NA, index=df.index, dtype='string'))
+    out['Date'] = pd.to_datetime(df['Date'], errors='coerce') if 'Date' in df else pd.NaT
+    out['Contact_Number'] = (normalize_contact(df['Contact_Number'])
+                             if 'Contact_Number' in df else pd.NA)
+    for col in NUMERIC_COLUMNS:
+        out[col] = pd.to_numeric(df[col], errors='coerce') if col in df else np.nan
+    for col in df.columns:
+        if col not in out:
+            out[col] = df[col]  # source tags and any other extra columns pass through
+
+    qty = out['Quantity'].to_numpy(dtype='float64')
+    weight = out['Weight_Grams'].to_numpy(dtype='float64')
+    rate = out['Rate_Per_Gram'].to_numpy(dtype='float64')
+    making = out['Making_Charges'].to_numpy(dtype='float64')
+    total = out['Total_Amount'].to_numpy(dtype='float64')
+    with np.errstate(invalid='ignore'):
+        expected = weight * rate * qty + making
+        tolerance = np.maximum(limits['total_tolerance'], limits['total_rel_tolerance'] * total)
+        checks = {
+            'missing_bill_no': out['Bill_No'].isna().to_numpy(),
+            'bad_date': out['Date'].isna().to_numpy(),
+            'bad_quantity': ~((qty >= 1) & (qty <= limits['max_quantity']) & (qty == np.round(qty))),
+            'bad_weight': ~((weight > 0) & (weight <= limits['max_weight'])),
+            'bad_rate': ~((rate > 0) & (rate <= limits['max_rate'])),
+            'bad_making_charges': ~(making >= 0),
+            'bad_total': ~(total >= 0),
+            'total_mismatch': np.abs(expected - total) > tolerance,
+        }
+    if 'Contact_Number' in df:
+        # A number that was given but cannot be read is rejected, not silently dropped
+        given = _clean_text(df['Contact_Number'].astype('string')).notna().to_numpy()
+        checks['bad_contact'] = given & out['Contact_Number'].isna().to_numpy()
+    checks['duplicate_bill_no'] = (out['Bill_No'].duplicated(keep='first').to_numpy()
+                                   & ~checks['missing_bill_no'])
+    if seen is not None:
+        keys = [None if pd.isna(b) else bill_key(b) for b in out['Bill_No']]
+        checks['duplicate_bill_no'] |= np.array([k in seen for k in keys], dtype=bool)
+        seen.update(k for k in keys if k is not None)
+
+    invalid = np.zeros(len(out), dtype=bool)
+    reasons = np.full(len(out), '', dtype=object)
+    for code, mask in checks.items():
+        invalid |= mask
+        reasons[mask] += code + ';'
+
+    rejects = df[invalid].copy()
+    rejects['Reject_Reason'] = [r.rstrip(';') for r in reasons[invalid]]
+    clean = out[~invalid].copy()
+    clean['Quantity'] = clean['Quantity'].astype('int64')
+    clean = clean[[c for c in df.columns if c in clean.columns]
+                  + [c for c in clean.columns if c not in df.columns]]
+    return clean.reset_index(drop=True), rejects.reset_index(drop=True)
+
+
+def write_rejects(rejects, reject_dir='rejects', fmt='csv', source=None):
+    """Write rejected rows to a timestamped CSV or Parquet file; returns its path (None if empty)"""
+    if rejects.empty:
+        return None
+    os.makedirs(reject_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    rejects = rejects.assign(Source=source) if source else rejects
+    if fmt == 'parquet':
+        path = os.path.join(reject_dir, f"rejects_{stamp}.parquet")
+        rejects.astype({c: 'string' for c in rejects.columns
+                        if rejects[c].dtype == object}).to_parquet(path, index=False)
+    else:
+        path = os.path.join(reject_dir, f"rejects_{stamp}.csv")
+        rejects.to_csv(path, index=False)
+    return path
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'app'))
+
+import engine  # noqa: E402
+
+
+def sqlite_config(tmp_path):
+    return dict(engine.DEFAULT_CONFIG, db_backend='sqlite',
+                sqlite_path=str(tmp_path / 'billing.db'))
+
+
+def test_ranged_export_queries_use_date_index(tmp_path):
+    report = engine.check_indexes(sqlite_config(tmp_path), year=2024)
+    assert report['all_indexed']
+    assert {q['query']: q['index'] for q in report['queries']} == {
+        'all_records': 'idx_billing_date_amount',
+        'monthly_summary': 'idx_billing_date_amount',
+        'top_customers': 'idx_billing_date_amount',
+    }
+
+
+def test_fresh_schema_without_year_passes(tmp_path):
+    report = engine.check_indexes(sqlite_config(tmp_path))
+    assert report['all_indexed']
+    scans = [q for q in report['queries'] if q['expected_scan']]
+    assert [q['query'] for q in scans] == ['all_records_all_time', 'monthly_summary_all_time',
+                                           'top_customers_all_time']
+    assert all(q['index'] == 'idx_billing_date_amount'
+               for q in report['queries'] if not q['expected_scan'])
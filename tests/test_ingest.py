@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'app'))
+
+import engine  # noqa: E402
+from rollups import check_rollups  # noqa: E402
+
+
+def bill(bill_no, making=6161.09, customer='Asha'):
+    return {'Bill_No': bill_no, 'Date': '2024-01-05', 'Customer_Name': customer,
+            'Contact_Number': '9876543210', 'Item_Name': 'Ring', 'Quantity': 1,
+            'Weight_Grams': 10.0, 'Rate_Per_Gram': 35000.0, 'Making_Charges': making,
+            'Total_Amount': round(350000 + making, 2), 'Payment_Mode': 'Cash'}
+
+
+def write(folder, name, rows):
+    pd.DataFrame(rows).to_excel(os.path.join(folder, name), index=False)
+
+
+def setup(tmp_path):
+    folder = tmp_path / 'workbooks'
+    folder.mkdir()
+    config = dict(engine.DEFAULT_CONFIG, db_backend='sqlite', workers=1,
+                  sqlite_path=str(tmp_path / 'billing.db'),
+                  manifest_path=str(tmp_path / 'manifest.pkl'),
+                  staging_cache_dir=str(tmp_path / 'staging_cache'),
+                  report_cache_dir=str(tmp_path / 'report_cache'),
+                  reject_dir=str(tmp_path / 'rejects'))
+    return str(folder), config
+
+
+def stored(config):
+    conn = sqlite3.connect(config['sqlite_path'])
+    try:
+        return dict(conn.execute("SELECT bill_no, total_amount FROM billing_records"))
+    finally:
+        conn.close()
+
+
+def rollup_mismatches(config):
+    conn = sqlite3.connect(config['sqlite_path'])
+    try:
+        return check_rollups(conn, 'sqlite')
+    finally:
+        conn.close()
+
+
+def test_second_load_of_same_rows_is_unchanged(tmp_path):
+    folder, config = setup(tmp_path)
+    write(folder, 'January_2024.xlsx', [bill('JB001'), bill('JB002'), bill('JB003')])
+
+    first = engine.ingest(config, folder)
+    assert (first['records_inserted'], first['records_updated'],
+            first['records_unchanged']) == (3, 0, 0)
+
+    # A fresh manifest makes the file new again; the diff upsert writes nothing
+    os.remove(config['manifest_path'])
+    second = engine.ingest(config, folder)
+    assert second['files_processed'] == 1
+    assert (second['records_inserted'], second['records_updated'],
+            second['records_unchanged']) == (0, 0, 3)
+
+
+def test_changed_amount_updates_row_and_rollups(tmp_path):
+    folder, config = setup(tmp_path)
+    write(folder, 'January_2024.xlsx', [bill('JB001'), bill('JB002')])
+    engine.ingest(config, folder)
+
+    write(folder, 'January_2024.xlsx', [bill('JB001', making=7000.0), bill('JB002')])
+    summary = engine.ingest(config, folder)
+
+    assert (summary['records_inserted'], summary['records_updated'],
+            summary['records_unchanged']) == (0, 1, 1)
+    assert stored(config) == {'JB001': 357000.0, 'JB002': 356161.09}
+    assert rollup_mismatches(config) == []
+
+
+def test_row_dropped_from_workbook_is_deleted(tmp_path):
+    folder, config = setup(tmp_path)
+    write(folder, 'January_2024.xlsx', [bill('JB001'), bill('JB002'), bill('JB003')])
+    write(folder, 'February_2024.xlsx', [bill('JB004')])
+    engine.ingest(config, folder)
+
+    write(folder, 'January_2024.xlsx', [bill('JB001'), bill('JB003')])
+    summary = engine.ingest(config, folder)
+
+    assert summary['files_processed'] == 1
+    assert summary['records_deleted'] == 1
+    assert sorted(stored(config)) == ['JB001', 'JB003', 'JB004']
+    assert rollup_mismatches(config) == []